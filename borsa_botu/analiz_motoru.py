@@ -3,225 +3,556 @@ import pandas_ta as ta
 import numpy as np
 import os
 import itertools
+import math
+import heapq
+import json
+import hashlib
+import argparse
 from datetime import datetime
 import time
 import sys
+import shutil
+import tempfile
 
 import multiprocessing as mp
 from functools import partial
+import indikatorler
+import strateji
+from mum_tamponu import LIVE_COLUMNS
 
 # Saf Gerçeklik ve Tam Dürüstlük Motoru - v9.1 (Turbo Mega Analiz)
-class UltimateMegaAnalyzerV9:
-    def __init__(self, timeframes=['5m', '15m', '30m', '1h', '4h']):
-        self.timeframes = timeframes
-        self.leverages = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
-        self.initial_balance = 250
-        self.margin_per_trade = 100
-        
-    def prepare_data(self, csv_file):
-        if not os.path.exists(csv_file): return None, None
-        df = pd.read_csv(csv_file)
-        if df.empty: return None, None
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.set_index('timestamp', inplace=True)
-        
-        # --- 25 İndikatör (Tam Set) ---
-        try:
-            df.ta.rsi(append=True)
-            df.ta.macd(append=True)
-            df.ta.adx(append=True)
-            df.ta.stoch(append=True)
-            df.ta.willr(append=True)
-            df.ta.supertrend(append=True)
-            df.ta.ema(length=20, append=True)
-            df.ta.ema(length=50, append=True)
-            df.ta.psar(append=True)
-            df.ta.fisher(append=True)
-            df.ta.vortex(append=True)
-            df.ta.hma(length=20, append=True)
-            df.ta.er(append=True)
-            df.ta.ao(append=True)
-            df.ta.chop(append=True)
-            df.ta.mfi(append=True)
-            df.ta.cci(append=True)
-            df.ta.mom(append=True)
-            df.ta.obv(append=True)
-            df.ta.bbands(append=True)
-            df.ta.dpo(append=True)
-            df.ta.cmo(append=True)
-            df.ta.ppo(append=True)
-            df.ta.uo(append=True)
-            df.ta.tsi(append=True)
-        except: pass
+def file_sha256(path):
+    """Dosya icerik ozeti (veri degisince checkpoint anahtarlari da degisir)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-        df.fillna(method='ffill', inplace=True)
-        cols = df.columns.tolist()
-        def get_col(prefix):
-            match = [c for c in cols if c.lower().startswith(prefix.lower())]
-            return match[0] if match else None
-
-        conditions = {
-            'RSI': (df[get_col('RSI_')] < 30, df[get_col('RSI_')] > 70),
-            'MACD': (df[get_col('MACDh_')] > 0, df[get_col('MACDh_')] < 0),
-            'ADX': (df[get_col('ADX_14')] > 25, df[get_col('ADX_14')] > 25),
-            'STOCH': (df[get_col('STOCHk_')] < 20, df[get_col('STOCHk_')] > 80),
-            'WILLR': (df[get_col('WILLR_')] < -80, df[get_col('WILLR_')] > -20),
-            'SUPERT': (df[get_col('SUPERTd_')] == 1, df[get_col('SUPERTd_')] == -1),
-            'EMA_X': (df['EMA_20'] > df['EMA_50'], df['EMA_20'] < df['EMA_50']),
-            'PSAR': (df['close'] > df[get_col('PSARl_')], df['close'] < df[get_col('PSARs_')]),
-            'FISHER': (df[get_col('FISHERt_')] > 0, df[get_col('FISHERt_')] < 0),
-            'VORTEX': (df[get_col('VTXP_')] > df[get_col('VTXM_')], df[get_col('VTXP_')] < df[get_col('VTXM_')]),
-            'HMA': (df['close'] > df[get_col('HMA_20')], df['close'] < df[get_col('HMA_20')]),
-            'ER': (df[get_col('ER_10')] > 0.5, df[get_col('ER_10')] > 0.5),
-            'AO': (df[get_col('AO_')] > 0, df[get_col('AO_')] < 0),
-            'CHOP': (df[get_col('CHOP_')] < 38, df[get_col('CHOP_')] < 38),
-            'MFI': (df[get_col('MFI_')] < 20, df[get_col('MFI_')] > 80),
-            'CCI': (df[get_col('CCI_')] < -100, df[get_col('CCI_')] > 100),
-            'MOM': (df[get_col('MOM_')] > 0, df[get_col('MOM_')] < 0),
-            'TSI': (df[get_col('TSI_')] > 0, df[get_col('TSI_')] < 0),
-            'UO': (df[get_col('UO_')] < 30, df[get_col('UO_')] > 70)
-        }
+def write_atomic(path, text):
+    """Gecici dosyaya yazip fsync sonrasi yeniden adlandirir; yarim dosya asla gorunmez."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
 
-        signal_df = pd.DataFrame(index=df.index)
-        for name, (l_cond, s_cond) in conditions.items():
-            try:
-                signal_df[f'L_{name}'] = l_cond.astype(int)
-                signal_df[f'S_{name}'] = s_cond.astype(int)
-            except: pass
-            
-        return df['close'], signal_df.fillna(0)
-
-def worker_task(combo_indices, close_arr, sig_vals, leverage, initial_balance, margin_per_trade):
-    l_active = np.all(sig_vals[:, [idx*2 for idx in combo_indices]], axis=1)
-    s_active = np.all(sig_vals[:, [idx*2+1 for idx in combo_indices]], axis=1)
-    
-    balance = initial_balance
-    active_trade = None
-    trades, wins = 0, 0
-    
-    for i in range(len(close_arr)-1):
-        curr = close_arr[i+1]
-        if active_trade:
-            side, entry, peak = active_trade['side'], active_trade['entry'], active_trade['peak']
-            if side == 'LONG':
-                peak = max(peak, curr)
-                pnl_pct = (curr - entry) / entry
-                is_stop = curr <= entry * 0.98 or (pnl_pct >= 0.01 and curr < peak * 0.995)
+# --- Indikator Onbellegi ---
+# Liste veya sinyal kurallari degisirse onbellek anahtari da degisir
+INDICATOR_CALLS = [
+    ('rsi', {}), ('macd', {}), ('adx', {}), ('stoch', {}), ('willr', {}), ('supertrend', {}),
+    ('ema', {'length': 20}), ('ema', {'length': 50}), ('hma', {'length': 20}), ('er', {}), ('ao', {}),
+    ('mfi', {}), ('cci', {}), ('mom', {}), ('obv', {}), ('bbands', {}), ('dpo', {}), ('cmo', {}), ('ppo', {})
+]
+# Yalnizca canli motorun artimli akisi olan kurallar taranir (PSAR, FISHER, VORTEX, CHOP, TSI, UO haric):
+# sampiyon kombinasyon bot tanimina oldugu gibi yazilabilir, canlida devre disi kalmaz
+SWEEP_RULES = {name: rules for name, rules in strateji.RULES.items()
+               if strateji.rule_error({"indicators": [name]}, LIVE_COLUMNS) is None}
+SIGNAL_RULES_VERSION = 2
+FEATURE_CACHE_DIR = ".feature_cache"
+
+def feature_params_hash():
+    """Indikator seti, cekirdek surumu ve taranan sinyal kurallari (SWEEP_RULES metni) ozeti."""
+    params = json.dumps([INDICATOR_CALLS, SIGNAL_RULES_VERSION, indikatorler.KERNEL_VERSION, SWEEP_RULES], sort_keys=True)
+    return hashlib.sha256(params.encode()).hexdigest()[:16]
+
+def feature_cache_path(csv_file):
+    """Anahtar: CSV icerik ozeti + indikator parametre seti."""
+    key = hashlib.sha256((file_sha256(csv_file) + feature_params_hash()).encode()).hexdigest()[:16]
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_file)), FEATURE_CACHE_DIR)
+    return os.path.join(cache_dir, f"{os.path.basename(csv_file)}.{key}.npz")
+
+def load_feature_cache(cache_path):
+    with np.load(cache_path, allow_pickle=False) as data:
+        df = pd.DataFrame(data["values"], columns=data["columns"].tolist(),
+                          index=pd.DatetimeIndex(data["index"], name='timestamp'))
+        return df, data["indicators"].tolist(), data["l_bits"], data["s_bits"]
+
+def store_feature_cache(cache_path, df, indicators, l_bits, s_bits):
+    """Kolonlari .npz olarak atomik yazar; ayni CSV'nin eski onbellek dosyalarini siler."""
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = os.path.basename(cache_path).rsplit('.', 2)[0] + '.'
+    for old in os.listdir(cache_dir):
+        if old.startswith(prefix) and old.endswith('.npz'):
+            os.remove(os.path.join(cache_dir, old))
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, index=df.index.values.astype('datetime64[ns]'), columns=np.array(df.columns, dtype=str),
+                     values=df.to_numpy(dtype=np.float64), indicators=np.array(indicators, dtype=str),
+                     l_bits=l_bits, s_bits=s_bits)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Onbellek yazilamadi: {e}")
+
+class ProgressJournal:
+    """(zaman dilimi, r, kaldirac seti, kombinasyon parcasi) anahtarli kalici ilerleme gunlugu.
+
+    Her parca sonucu once kendi dosyasina atomik yazilir, sonra journal.jsonl'e eklenir.
+    Sadece ikisi de tamamlanmis parcalar --resume ile atlanir.
+    """
+    def __init__(self, directory, fingerprint, resume=False):
+        self.directory = directory
+        self.chunk_dir = os.path.join(directory, "chunks")
+        self.journal_path = os.path.join(directory, "journal.jsonl")
+        manifest_path = os.path.join(directory, "manifest.json")
+        os.makedirs(directory, exist_ok=True)
+
+        manifest = None
+        if resume and os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest != fingerprint:
+                print("Checkpoint ayarlari degismis, sifirdan baslaniyor.")
+                manifest = None
+        if manifest is None:
+            shutil.rmtree(self.chunk_dir, ignore_errors=True)
+            if os.path.exists(self.journal_path): os.remove(self.journal_path)
+            write_atomic(manifest_path, json.dumps(fingerprint))
+        os.makedirs(self.chunk_dir, exist_ok=True)
+
+        self.done = set()
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try: self.done.add(json.loads(line)["key"])
+                    except ValueError: pass # Yarim kalmis son satir
+
+    def _path(self, key):
+        return os.path.join(self.chunk_dir, key.replace("|", "_") + ".json")
+
+    def is_done(self, key):
+        return key in self.done and (key.endswith("|report") or os.path.exists(self._path(key)))
+
+    def load(self, key):
+        with open(self._path(key), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def commit(self, key, payload=None):
+        if payload is not None:
+            write_atomic(self._path(key), json.dumps(payload))
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.add(key)
+
+# Cikis kurallari (Tum kombinasyonlar icin ortak: %2 stop, %1 tetik, %0.5 iz suren stop)
+STOP_LOSS = 0.02
+TS_TRIGGER = 0.01
+TS_OFFSET = 0.005
+
+def build_exit_table(close_arr, sl=STOP_LOSS, ts_trigger=TS_TRIGGER, ts_offset=TS_OFFSET, horizon=256):
+    """Her giris bari ve yonu icin cikis barini ve pnl_pct degerini onceden hesaplar.
+
+    Satir 0 LONG, satir 1 SHORT. Giris close[i] fiyatindan yapilir, cikis kontrolu
+    close[i+2]'den baslar (worker_task dongusuyle birebir ayni). Cikis yoksa indeks len(close_arr) olur.
+    """
+    close_arr = np.asarray(close_arr, dtype=np.float64)
+    n = len(close_arr)
+    exit_idx = np.full((2, n), n, dtype=np.int64)
+    exit_pnl = np.zeros((2, n), dtype=np.float64)
+
+    for side in (0, 1):
+        pending = np.arange(max(n - 1, 0))
+        h = horizon
+        while pending.size:
+            unresolved = []
+            # Bellek siniri: tek seferde en fazla ~4M hucre
+            step = max(1, (1 << 22) // h)
+            for s in range(0, pending.size, step):
+                chunk = pending[s:s + step]
+                idx = chunk[:, None] + 2 + np.arange(h)
+                valid = idx < n
+                curr = close_arr[np.minimum(idx, n - 1)]
+                entry = close_arr[chunk][:, None]
+                if side == 0:
+                    peak = np.maximum(np.maximum.accumulate(curr, axis=1), entry)
+                    pnl = (curr - entry) / entry
+                    stop = (curr <= entry * (1 - sl)) | ((pnl >= ts_trigger) & (curr < peak * (1 - ts_offset)))
+                else:
+                    peak = np.minimum(np.minimum.accumulate(curr, axis=1), entry)
+                    pnl = (entry - curr) / entry
+                    stop = (curr >= entry * (1 + sl)) | ((pnl >= ts_trigger) & (curr > peak * (1 + ts_offset)))
+                stop &= valid
+                hit = stop.any(axis=1)
+                first = stop.argmax(axis=1)
+                rows = np.flatnonzero(hit)
+                exit_idx[side, chunk[rows]] = idx[rows, first[rows]]
+                exit_pnl[side, chunk[rows]] = pnl[rows, first[rows]]
+                # Pencere veri sonuna ulasmadiysa daha uzun ufukla tekrar dene
+                unresolved.append(chunk[~hit & valid[:, -1]])
+            pending = np.concatenate(unresolved) if unresolved else pending[:0]
+            h *= 4
+
+    return exit_idx, exit_pnl
+
+# Tek gorevde birlikte simule edilen kombinasyon sayisi
+BATCH_SIZE = 512
+# Rapora girmek icin gereken minimum islem sayisi (t > 5 filtresi)
+MIN_TRADES = 6
+
+def apriori_candidates(alive, n_indicators):
+    """Tum (r-1)'lik alt kumeleri canli olan r'lik kombinasyonlari leksikografik sirayla uretir.
+
+    Bir kombinasyonun giris sinyali MIN_TRADES'ten azsa tum ust kumeleri de oyledir;
+    bu yuzden olu bir alt kumesi olan kombinasyon hic simule edilmez.
+    """
+    candidates = []
+    for parent in sorted(alive):
+        for j in range(parent[-1] + 1, n_indicators):
+            combo = parent + (j,)
+            if all(combo[:m] + combo[m+1:] in alive for m in range(len(combo) - 1)):
+                candidates.append(combo)
+    return candidates
+
+def lattice_masks(combos, l_bits, s_bits):
+    """Leksikografik sirali kombinasyonlarin bit-paketli giris maskelerini kurar.
+
+    Kombinasyon kafesi onek (prefix) yigini ile gezilir: her maske, yigindaki
+    (r-1)'lik ebeveyn maskesinin tek bir indikatorle AND'lenmesiyle elde edilir.
+    """
+    B, nbytes = len(combos), l_bits.shape[1]
+    out_l = np.empty((B, nbytes), dtype=np.uint8)
+    out_s = np.empty((B, nbytes), dtype=np.uint8)
+    stack_l, stack_s = [], []
+    prev = ()
+    for b, combo in enumerate(combos):
+        r = len(combo)
+        d = 0
+        while d < len(stack_l) and d < r - 1 and prev[d] == combo[d]: d += 1
+        del stack_l[d:], stack_s[d:]
+        for j in range(d, r - 1):
+            if j == 0:
+                stack_l.append(l_bits[combo[0]]); stack_s.append(s_bits[combo[0]])
             else:
-                peak = min(peak, curr)
-                pnl_pct = (entry - curr) / entry
-                is_stop = curr >= entry * 1.02 or (pnl_pct >= 0.01 and curr > peak * 1.005)
-
-            if is_stop:
-                balance += pnl_pct * leverage * margin_per_trade
-                if pnl_pct > 0: wins += 1
-                active_trade = None
-                if balance <= 10: balance = 0; break
+                stack_l.append(stack_l[-1] & l_bits[combo[j]]); stack_s.append(stack_s[-1] & s_bits[combo[j]])
+        if r == 1:
+            out_l[b] = l_bits[combo[0]]; out_s[b] = s_bits[combo[0]]
         else:
-            if l_active[i]:
-                active_trade = {'side': 'LONG', 'entry': close_arr[i], 'peak': close_arr[i]}
-                trades += 1
-            elif s_active[i]:
-                active_trade = {'side': 'SHORT', 'entry': close_arr[i], 'peak': close_arr[i]}
-                trades += 1
-                
-    return (balance, (wins/trades*100) if trades > 0 else 0, trades)
+            np.bitwise_and(stack_l[-1], l_bits[combo[-1]], out=out_l[b])
+            np.bitwise_and(stack_s[-1], s_bits[combo[-1]], out=out_s[b])
+        prev = combo
+    return out_l, out_s
+
+def extract_trades(l_packed, s_packed, n, exit_idx, exit_pnl):
+    """Tum kombinasyonlarin durum makinelerini islem adimlariyla birlikte (lockstep) ilerletir.
+
+    Islem dizisi kaldiractan bagimsizdir; her kombinasyonun kapanan islemlerinin pnl_pct
+    dizisi (B x T, sifirla doldurulmus), kapanan islem sayisi ve toplam giris sayisi doner.
+    """
+    B = l_packed.shape[0]
+    trades = np.zeros(B, dtype=np.int64)
+    closed_count = np.zeros(B, dtype=np.int64)
+    steps = []
+
+    # Sinyal barlarini satir-sirali anahtarlara cevir: anahtar = satir * n + bar
+    active = np.unpackbits(l_packed | s_packed, axis=1, count=n)[:, :n-1]
+    # MIN_TRADES'ten az giris sinyali olan kombinasyon olu: simule edilmez
+    dead = active.sum(axis=1) < MIN_TRADES
+    rows, cols = np.nonzero(active)
+    keys = rows * n + cols
+    if keys.size:
+        base = np.arange(B, dtype=np.int64) * n
+        pos = np.zeros(B, dtype=np.int64)
+        live = ~dead
+        while live.any():
+            r = np.flatnonzero(live)
+            k = np.minimum(np.searchsorted(keys, base[r] + pos[r]), keys.size - 1)
+            found = (keys[k] >= base[r] + pos[r]) & (keys[k] < base[r] + n)
+            live[r[~found]] = False
+            r, k = r[found], k[found]
+            if not r.size: break
+
+            i = keys[k] - base[r]
+            side = np.where((l_packed[r, i >> 3] >> (7 - (i & 7))) & 1, 0, 1)
+            trades[r] += 1
+            e = exit_idx[side, i]
+
+            # Veri sonuna kadar acik kalan islemler
+            still_open = e >= n
+            live[r[still_open]] = False
+            closed = ~still_open
+            r, i, side, e = r[closed], i[closed], side[closed], e[closed]
+
+            step = np.zeros(B)
+            step[r] = exit_pnl[side, i]
+            steps.append(step)
+            closed_count[r] += 1
+            pos[r] = e
+
+    pnl_seq = np.stack(steps, axis=1) if steps else np.zeros((B, 0))
+    return dead, pnl_seq, closed_count, trades
+
+def leverage_outcomes(pnl_seq, closed_count, trades, leverages, initial_balance, margin_per_trade):
+    """Tek islem dizisinden tum kaldiraclarin (balance, win_rate, trades) sonuclarini turetir.
+
+    Bakiye yolu kumulatif toplamla, balance <= 10 iflas noktasi ilk kesisim aramasiyla bulunur.
+    """
+    B, T = pnl_seq.shape
+    levs = np.asarray(leverages, dtype=np.float64)
+    # Baslangic bakiyesi ilk sutun: toplama sirasi orijinal dongudeki ile ayni kalir
+    steps = pnl_seq[:, None, :] * levs[None, :, None] * margin_per_trade
+    path = np.cumsum(np.concatenate([np.full((B, len(levs), 1), float(initial_balance)), steps], axis=2), axis=2)[:, :, 1:]
+    valid = np.arange(T)[None, None, :] < closed_count[:, None, None]
+    crossed = (path <= 10) & valid
+    wiped = crossed.any(axis=2)
+    first = crossed.argmax(axis=2)
+
+    cum_wins = np.cumsum(pnl_seq > 0, axis=1)
+    total_wins = cum_wins[:, -1] if T else np.zeros(B, dtype=np.int64)
+    final = path[:, :, -1] if T else np.full((B, len(levs)), float(initial_balance))
+
+    balance = np.where(wiped, 0.0, final)
+    n_trades = np.where(wiped, first + 1, trades[:, None])
+    n_wins = np.where(wiped, np.take_along_axis(cum_wins, first, axis=1) if T else 0, total_wins[:, None])
+    win_rate = np.where(n_trades > 0, n_wins / np.maximum(n_trades, 1) * 100, 0)
+    return balance, win_rate, n_trades
+
+def simulate_batch(l_packed, s_packed, n, exit_idx, exit_pnl, leverages, initial_balance, margin_per_trade):
+    """Her kombinasyon icin kaldirac basina (balance, win_rate, trades) listesi; olu kombinasyonlar icin None doner."""
+    dead, pnl_seq, closed_count, trades = extract_trades(l_packed, s_packed, n, exit_idx, exit_pnl)
+    balance, win_rate, n_trades = leverage_outcomes(pnl_seq, closed_count, trades, leverages, initial_balance, margin_per_trade)
+    return [None if dead[c] else [(float(balance[c, j]), float(win_rate[c, j]), int(n_trades[c, j])) for j in range(len(leverages))]
+            for c in range(len(dead))]
+
+# Iscinin bagli oldugu paylasimli diziler (zaman dilimi degisince yenilenir)
+_ATTACHED = {"spec": None, "arrays": None}
+
+def publish_arrays(workdir, tag, **arrays):
+    """Dizileri .npy dosyasi olarak bir kez yazar; gorevlere sadece dosya yollari gider."""
+    spec = {}
+    for name, arr in arrays.items():
+        path = os.path.join(workdir, f"{tag}_{name}.npy")
+        np.save(path, np.ascontiguousarray(arr))
+        spec[name] = path
+    return spec
+
+def attach_arrays(spec):
+    """Iscide dizilere mmap ile kopyasiz baglanir; ayni spec icin baglanti tekrar kullanilir."""
+    if _ATTACHED["spec"] != spec:
+        _ATTACHED["arrays"] = {name: np.load(path, mmap_mode='r') for name, path in spec.items()}
+        _ATTACHED["spec"] = spec
+    return _ATTACHED["arrays"]
+
+def worker_task(task, spec, leverages, initial_balance, margin_per_trade):
+    chunk_id, combo_batch = task
+    arrays = attach_arrays(spec)
+    exit_idx, exit_pnl = arrays["exit_idx"], arrays["exit_pnl"]
+    l_packed, s_packed = lattice_masks(combo_batch, arrays["l_bits"], arrays["s_bits"])
+    results = simulate_batch(l_packed, s_packed, exit_idx.shape[1], exit_idx, exit_pnl, leverages, initial_balance, margin_per_trade)
+    # imap_unordered sirasiz dondugu icin sonuclar parca no ve kombinasyonlariyla birlikte gider
+    return chunk_id, list(zip(combo_batch, results))
+
+def rank_key(row):
+    """Toplam sira: bakiye, esitlikte kombinasyon ve kaldirac (sinirda kalan sonuc gelis sirasina bagli olmasin)."""
+    return (row['Final_$'], row['Combo'], row['Lev'])
+
+class TopKCollector:
+    """Sonuclari geldikce tuketen, anahtar basina sinirli (min-heap) liderlik tablosu."""
+    def __init__(self, k=50):
+        self.k = k
+        self.boards = {}
+        self._seq = itertools.count()
+
+    def push(self, key, row):
+        heap = self.boards.setdefault(key, [])
+        item = (rank_key(row), next(self._seq), row)
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def top(self, key):
+        # Sira push ile ayni anahtardan: resume / paralel kosu taze kosuyla ayni raporu verir
+        items = sorted(self.boards.get(key, []), key=lambda x: x[0], reverse=True)
+        return [row for _, _, row in items]
+
+    def snapshot(self, path, keys):
+        """Secili tablolari JSON olarak atomik yazar (kosu devam ederken okunabilir)."""
+        data = {str(key): self.top(key) for key in keys}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
 
 class UltimateMegaAnalyzerV9:
-    def __init__(self, timeframes=['5m', '15m', '30m', '1h', '4h']):
+    def __init__(self, timeframes=['5m', '15m', '30m', '1h', '4h'], top_k=50, chunk_size=4):
         self.timeframes = timeframes
         self.leverages = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
         self.initial_balance = 250
         self.margin_per_trade = 100
+        # Sonuc toplama: r basina ve zaman dilimi basina (global) ilk top_k
+        self.chunk_size = chunk_size
+        self.collector = TopKCollector(top_k)
+        self.live_board_file = "sampiyonlar_v9_canli.json"
+        self.snapshot_interval = 30
+        self.checkpoint_dir = "v9_checkpoint"
+        self.journal = None
+
+    def leaderboard(self, tf):
+        """Zaman diliminin global liderlik tablosu (kosu surerken de okunabilir)."""
+        return self.collector.top(tf)
 
     def prepare_data(self, csv_file):
-        if not os.path.exists(csv_file): return None, None
+        features = self.load_features(csv_file)
+        if features is None: return None, None, None, None
+        df, indicators, l_bits, s_bits = features
+        return df['close'], indicators, l_bits, s_bits
+
+    def load_features(self, csv_file):
+        """Indikator kolonlarini ve bit-paketli sinyalleri onbellekten yukler, yoksa hesaplayip yazar."""
+        if not os.path.exists(csv_file): return None
+        cache_path = feature_cache_path(csv_file)
+        if os.path.exists(cache_path):
+            try:
+                return load_feature_cache(cache_path)
+            except Exception as e:
+                print(f"Onbellek okunamadi, yeniden hesaplaniyor: {e}")
+
         df = pd.read_csv(csv_file)
-        if df.empty: return None, None
+        if df.empty: return None
         df['timestamp'] = pd.to_datetime(df['timestamp'])
         df.set_index('timestamp', inplace=True)
         try:
-            df.ta.rsi(append=True); df.ta.macd(append=True); df.ta.adx(append=True)
-            df.ta.stoch(append=True); df.ta.willr(append=True); df.ta.supertrend(append=True)
-            df.ta.ema(length=20, append=True); df.ta.ema(length=50, append=True)
-            df.ta.psar(append=True); df.ta.fisher(append=True); df.ta.vortex(append=True)
-            df.ta.hma(length=20, append=True); df.ta.er(append=True); df.ta.ao(append=True)
-            df.ta.chop(append=True); df.ta.mfi(append=True); df.ta.cci(append=True)
-            df.ta.mom(append=True); df.ta.obv(append=True); df.ta.bbands(append=True)
-            df.ta.dpo(append=True); df.ta.cmo(append=True); df.ta.ppo(append=True)
-            df.ta.uo(append=True); df.ta.tsi(append=True)
+            # NumPy cekirdegi olanlar indikatorler.py'den, digerleri pandas_ta'dan (kolon sirasi ayni)
+            for name, params in INDICATOR_CALLS:
+                kernel = indikatorler.kernel_for(name, params)
+                if kernel: indikatorler.add_indicators(df, [kernel])
+                else: getattr(df.ta, name)(append=True, **params)
         except: pass
-        df.fillna(method='ffill', inplace=True)
-        cols = df.columns.tolist()
-        def get_col(prefix):
-            match = [c for c in cols if c.lower().startswith(prefix.lower())]
-            return match[0] if match else None
-        conditions = {
-            'RSI': (df[get_col('RSI_')] < 30, df[get_col('RSI_')] > 70),
-            'MACD': (df[get_col('MACDh_')] > 0, df[get_col('MACDh_')] < 0),
-            'ADX': (df[get_col('ADX_14')] > 25, df[get_col('ADX_14')] > 25),
-            'STOCH': (df[get_col('STOCHk_')] < 20, df[get_col('STOCHk_')] > 80),
-            'WILLR': (df[get_col('WILLR_')] < -80, df[get_col('WILLR_')] > -20),
-            'SUPERT': (df[get_col('SUPERTd_')] == 1, df[get_col('SUPERTd_')] == -1),
-            'EMA_X': (df['EMA_20'] > df['EMA_50'], df['EMA_20'] < df['EMA_50']),
-            'PSAR': (df['close'] > df[get_col('PSARl_')], df['close'] < df[get_col('PSARs_')]),
-            'FISHER': (df[get_col('FISHERt_')] > 0, df[get_col('FISHERt_')] < 0),
-            'VORTEX': (df[get_col('VTXP_')] > df[get_col('VTXM_')], df[get_col('VTXP_')] < df[get_col('VTXM_')]),
-            'HMA': (df['close'] > df[get_col('HMA_20')], df['close'] < df[get_col('HMA_20')]),
-            'ER': (df[get_col('ER_10')] > 0.5, df[get_col('ER_10')] > 0.5),
-            'AO': (df[get_col('AO_')] > 0, df[get_col('AO_')] < 0),
-            'CHOP': (df[get_col('CHOP_')] < 38, df[get_col('CHOP_')] < 38),
-            'MFI': (df[get_col('MFI_')] < 20, df[get_col('MFI_')] > 80),
-            'CCI': (df[get_col('CCI_')] < -100, df[get_col('CCI_')] > 100),
-            'MOM': (df[get_col('MOM_')] > 0, df[get_col('MOM_')] < 0),
-            'TSI': (df[get_col('TSI_')] > 0, df[get_col('TSI_')] < 0),
-            'UO': (df[get_col('UO_')] < 30, df[get_col('UO_')] > 70)
-        }
-        signal_df = pd.DataFrame(index=df.index)
-        for name, (l_cond, s_cond) in conditions.items():
+        df.ffill(inplace=True)
+        # Her indikator icin bit-paketli LONG/SHORT sinyal kumeleri (bar basina 1 bit);
+        # kurallar canli motorla ortak (strateji.RULES, canli akisi olanlar)
+        indicators, l_rows, s_rows = [], [], []
+        for name, (long_rule, short_rule) in SWEEP_RULES.items():
             try:
-                signal_df[f'L_{name}'] = l_cond.astype(int)
-                signal_df[f'S_{name}'] = s_cond.astype(int)
-            except: pass
-        return df['close'], signal_df.fillna(0)
+                l_row = strateji.vector_mask(long_rule, df)
+                s_row = strateji.vector_mask(short_rule, df)
+            except KeyError: continue
+            indicators.append(name); l_rows.append(l_row); s_rows.append(s_row)
+        l_bits = np.packbits(np.array(l_rows, dtype=bool), axis=1)
+        s_bits = np.packbits(np.array(s_rows, dtype=bool), axis=1)
+        store_feature_cache(cache_path, df, indicators, l_bits, s_bits)
+        return df, indicators, l_bits, s_bits
 
-    def run(self):
+    def run(self, resume=False):
         print(f"--- TURBO MEGA ANALIZ V9.1 BASLATILDI (PID: {os.getpid()}) ---")
-        for tf in self.timeframes:
-            csv_path = f"btc_usdt_{tf}.csv"
-            close, sig_df = self.prepare_data(csv_path)
-            if close is None: continue
+        fingerprint = {
+            "leverages": self.leverages, "initial_balance": self.initial_balance,
+            "margin_per_trade": self.margin_per_trade, "top_k": self.collector.k,
+            "batch_size": BATCH_SIZE, "min_trades": MIN_TRADES,
+            "exit": [STOP_LOSS, TS_TRIGGER, TS_OFFSET], "features": feature_params_hash()
+        }
+        self.journal = ProgressJournal(self.checkpoint_dir, fingerprint, resume=resume)
+        # Tek, uzun omurlu havuz: diziler dosyaya bir kez yazilir, isciler mmap ile baglanir
+        workdir = tempfile.mkdtemp(prefix="v9_shared_")
+        try:
+            with mp.Pool(mp.cpu_count()) as pool:
+                for tf in self.timeframes:
+                    self.run_timeframe(pool, workdir, tf)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_timeframe(self, pool, workdir, tf):
+        csv_path = f"btc_usdt_{tf}.csv"
+        close, indicators, l_bits, s_bits = self.prepare_data(csv_path)
+        if close is None: return
+        
+        close_arr = close.to_numpy()
+        # Cikis tablosu kombinasyondan bagimsiz: zaman dilimi basina bir kez kurulur
+        exit_idx, exit_pnl = build_exit_table(close_arr)
+        spec = publish_arrays(workdir, tf, l_bits=l_bits, s_bits=s_bits, exit_idx=exit_idx, exit_pnl=exit_pnl)
+        # Checkpoint anahtari veri ve kural/cekirdek ozetini icerir: biri degisirse eski parcalar kullanilmaz
+        tf_key = f"{tf}@{file_sha256(csv_path)[:12]}.{feature_params_hash()[:8]}"
+        lev_key = "lev" + "-".join(str(lev) for lev in self.leverages)
+        func = partial(worker_task, spec=spec, leverages=self.leverages,
+                       initial_balance=self.initial_balance, margin_per_trade=self.margin_per_trade)
+        
+        print(f"\n>>> ZAMAN DILIMI: {tf.upper()} | Indikator Sayısı: {len(indicators)}")
+        
+        alive = None
+        space_total, space_pruned = 0, 0
+        last_snapshot = time.time()
+        for r in range(1, len(indicators) + 1):
+            if r == 1:
+                combos = [(i,) for i in range(len(indicators))]
+            else:
+                combos = apriori_candidates(alive, len(indicators))
+            total = math.comb(len(indicators), r)
+            space_total += total
+            space_pruned += total - len(combos)
+            if not combos:
+                # Ust seviyelerin tamami da olu
+                rest = sum(math.comb(len(indicators), q) for q in range(r + 1, len(indicators) + 1))
+                space_total += rest; space_pruned += rest
+                print(f"  {r}+ kombinasyonlar: tamami budandi")
+                break
+            print(f"  {r}-li kombinasyonlar ({len(combos)}/{total} adet) isleniyor...")
             
-            indicators = [c.replace('L_', '') for c in sig_df.columns if c.startswith('L_')]
-            close_arr = close.to_numpy()
-            sig_vals = sig_df.to_numpy()
+            alive = set()
+            # Paralel isleme: Kombinasyonlar toplu (batch) simule edilir, tum kaldiraclar tek geciste.
+            # Sonuclar geldikce sinirli top-K tablolarina akar; tum sonuc listesi bellekte tutulmaz.
+            batches = [combos[i:i + BATCH_SIZE] for i in range(0, len(combos), BATCH_SIZE)]
+            chunk_key = lambda c: f"{tf_key}|r{r}|{lev_key}|c{c}"
+            tasks = []
+            for chunk_id, batch in enumerate(batches):
+                if self.journal.is_done(chunk_key(chunk_id)):
+                    # Tamamlanmis parca: kayitli sonuclari birlestir
+                    saved = self.journal.load(chunk_key(chunk_id))
+                    alive.update(tuple(c) for c in saved["alive"])
+                    for row in saved["rows"]:
+                        self.collector.push((tf, r), row); self.collector.push(tf, row)
+                else:
+                    tasks.append((chunk_id, batch))
+            if len(tasks) < len(batches):
+                print(f"    {len(batches) - len(tasks)}/{len(batches)} parca checkpoint'ten yuklendi")
             
-            print(f"\n>>> ZAMAN DILIMI: {tf.upper()} | Indikator Sayısı: {len(indicators)}")
+            for chunk_id, batch_res in pool.imap_unordered(func, tasks, chunksize=self.chunk_size):
+                chunk_alive, chunk_rows = [], []
+                for combo, per_lev in batch_res:
+                    if per_lev is None: continue
+                    alive.add(combo)
+                    chunk_alive.append(combo)
+                    chunk_rows.extend(self.collect(tf, r, indicators, combo, per_lev))
+                top_rows = heapq.nlargest(self.collector.k, chunk_rows, key=rank_key)
+                self.journal.commit(chunk_key(chunk_id), {"alive": chunk_alive, "rows": top_rows})
+                if time.time() - last_snapshot > self.snapshot_interval:
+                    self.collector.snapshot(self.live_board_file, self.timeframes)
+                    last_snapshot = time.time()
             
-            for r in range(1, len(indicators) + 1):
-                combos = list(itertools.combinations(range(len(indicators)), r))
-                print(f"  {r}-li kombinasyonlar ({len(combos)} adet) isleniyor...")
-                
-                all_res = []
-                # Paralel isleme: Her kaldıraç ve kombinasyon ikilisi icin
-                with mp.Pool(mp.cpu_count()) as pool:
-                    for lev in self.leverages:
-                        func = partial(worker_task, close_arr=close_arr, sig_vals=sig_vals, 
-                                       leverage=lev, initial_balance=self.initial_balance, 
-                                       margin_per_trade=self.margin_per_trade)
-                        results = pool.map(func, combos)
-                        
-                        for idx, (bal, wr, t) in enumerate(results):
-                            if t > 5 and bal > 1000:
-                                combo_names = "+".join([indicators[i] for i in combos[idx]])
-                                all_res.append({'TF': tf, 'Combo': combo_names, 'Lev': lev, 'Final_$': round(bal, 2), 'Trades': t})
-                    
-                if all_res:
-                    self.save_report(all_res, f"V9_TF_{tf}_R_{r}")
-
-    def save_report(self, results, tag):
-        df = pd.DataFrame(results)
-        top = df.sort_values(by='Final_$', ascending=False).head(50)
+            top = self.collector.top((tf, r))
+            report_key = f"{tf_key}|r{r}|{lev_key}|report"
+            if top and not self.journal.is_done(report_key):
+                self.save_report(top, f"V9_TF_{tf}_R_{r}")
+                self.journal.commit(report_key)
+            self.collector.boards.pop((tf, r), None)
+            self.collector.snapshot(self.live_board_file, self.timeframes)
+            last_snapshot = time.time()
+        
+        report_key = f"{tf_key}|global|{lev_key}|report"
+        if self.leaderboard(tf) and not self.journal.is_done(report_key):
+            self.save_report(self.leaderboard(tf), f"V9_TF_{tf}_GLOBAL")
+            self.journal.commit(report_key)
+        if space_total:
+            print(f"  Budama ({tf}): {space_pruned}/{space_total} kombinasyon atlandi (%{space_pruned / space_total * 100:.1f})")
+
+    def collect(self, tf, r, indicators, combo, per_lev):
+        combo_names = "+".join([indicators[i] for i in combo])
+        rows = []
+        for lev, (bal, wr, t) in zip(self.leverages, per_lev):
+            if t >= MIN_TRADES and bal > 1000:
+                row = {'TF': tf, 'Combo': combo_names, 'Lev': lev, 'Final_$': round(bal, 2), 'Trades': t}
+                self.collector.push((tf, r), row)
+                self.collector.push(tf, row)
+                rows.append(row)
+        return rows
+
+    def save_report(self, top_rows, tag):
+        # Satirlar collector'dan zaten sirali ve sinirli (top_k) gelir
+        top = pd.DataFrame(top_rows)
         with open("sampiyonlar_v9.txt", "a", encoding="utf-8") as f:
             f.write(f"\n[{datetime.now().strftime('%H:%M:%S')}] --- {tag} ---\n")
             f.write(top.to_string(index=False) + "\n")
@@ -229,5 +560,8 @@ class UltimateMegaAnalyzerV9:
 if __name__ == "__main__":
     # Windows'ta multiprocessing için gerekli
     mp.freeze_support()
+    parser = argparse.ArgumentParser(description="Turbo Mega Analiz V9.1")
+    parser.add_argument("--resume", action="store_true", help="Tamamlanmis parcalari atla, kayitli sonuclari birlestir")
+    args = parser.parse_args()
     analyzer = UltimateMegaAnalyzerV9()
-    analyzer.run()
+    analyzer.run(resume=args.resume)
@@ -0,0 +1,137 @@
+import itertools
+import numpy as np
+
+# Bot Tablosu (struct-of-arrays)
+# Bir sembolün tüm botları (parametre varyantları dahil) tek tabloda: her alan bir NumPy sütunu.
+# Fiyat tikinde PnL, zirve ve çıkış koşulları tüm satırlar için dizi işlemleriyle hesaplanır;
+# SYSTEM_STATE'e yalnızca değişen satırlar (zirve, kapanan pozisyon) geri yazılır.
+# Giriş ve kapanış olayları (nadir) bot sözlükleri üzerinden yapılır, tablo track() ile tazelenir.
+
+SIDES = {"LONG": 1, "SHORT": -1}
+SETTINGS = ("sl", "ts_trigger", "ts_offset")
+
+def expand_variants(bots):
+    """"variants" ızgarası olan botu her sl/ts_trigger/ts_offset kombinasyonu için ayrı bota açar.
+    Ör. "variants": {"sl": [0.01, 0.02], "ts_offset": [0.003, 0.005]} -> 4 bot; id = id*1000 + sıra."""
+    out = []
+    for bot in bots:
+        grid = bot.get("variants")
+        if not grid:
+            out.append(bot); continue
+        keys = [k for k in SETTINGS if k in grid]
+        for k, combo in enumerate(itertools.product(*(grid[key] for key in keys)), 1):
+            variant = {key: val for key, val in bot.items() if key != "variants"}
+            variant["settings"] = {**bot["settings"], **dict(zip(keys, combo))}
+            variant["id"] = bot["id"] * 1000 + k
+            variant["name"] = f"{bot['name']}#" + ",".join(f"{key}={val}" for key, val in zip(keys, combo))
+            variant["active_trade"] = None
+            out.append(variant)
+    return out
+
+class BotTable:
+    """Bot sözlüklerinin pozisyon alanlarını sütunlarda tutar; satır i = bots[i]."""
+
+    def __init__(self, bots, leverage=50):
+        self.bots = list(bots)
+        self.leverage = leverage
+        self.index = {b["id"]: i for i, b in enumerate(self.bots)}
+        n = len(self.bots)
+        self.side = np.zeros(n, dtype=np.int8)  # 1 LONG, -1 SHORT, 0 pozisyon yok
+        self.entry = np.full(n, np.nan)
+        self.peak = np.full(n, np.nan)
+        self.margin = np.zeros(n)
+        self.balance = np.zeros(n)
+        self.pnl = np.zeros(n)  # açık pozisyonun anlık PnL'i ($)
+        self.opened = np.zeros(n, dtype=np.int64)  # giriş zamanı (ms); daha eski tikler bu satıra uygulanmaz
+        self.sl, self.ts_trigger, self.ts_offset = (np.array([b["settings"][k] for b in self.bots], dtype=np.float64)
+                                                    for k in SETTINGS)
+        self.trades = [None] * n  # satırın izlediği active_trade sözlüğü
+        self.sync()
+
+    def matches(self, bots):
+        """Aynı bot nesneleri aynı sırada mı (değilse tablo yeniden kurulmalı)."""
+        return len(bots) == len(self.bots) and all(a is b for a, b in zip(bots, self.bots))
+
+    def _load(self, i):
+        bot = self.bots[i]
+        active = self.trades[i] = bot.get("active_trade")
+        self.balance[i] = bot["balance"]
+        self.sl[i], self.ts_trigger[i], self.ts_offset[i] = (bot["settings"][k] for k in SETTINGS)
+        if active:
+            self.side[i] = SIDES[active["side"]]
+            self.entry[i], self.peak[i] = active["entry"], active["peak"]
+            self.margin[i] = active.get("margin", 0.0)
+            self.opened[i] = active.get("time", 0)
+        else:
+            self.side[i] = self.opened[i] = 0
+            self.entry[i] = self.peak[i] = np.nan
+            self.margin[i] = self.pnl[i] = 0.0
+
+    def track(self, bot):
+        """Tablo dışında değişen tek botu (giriş, kapanış) yeniden okur."""
+        self._load(self.index[bot["id"]])
+
+    def sync(self):
+        """Tüm satırları sözlüklerden tazeler (reset gibi dış değişiklikler için, tur başına bir kez)."""
+        for i in range(len(self.bots)):
+            self._load(i)
+
+    def has_open(self):
+        return bool(self.side.any())
+
+    def step(self, price, ts=None):
+        """Tüm satırlar için zirve/PnL günceller; [(satır, sebep), ...] çıkışlarını döner (strateji.check_exit ile aynı).
+        ts (ms) verilirse girişten önceki tikler (akışta birikmiş eski fiyatlar) o satıra uygulanmaz."""
+        side = self.side
+        is_open = side != 0
+        if ts is not None:
+            is_open &= self.opened <= ts
+        with np.errstate(invalid='ignore'):
+            pnl_raw = side * (price - self.entry) / self.entry
+            peak = np.where(is_open, np.where(side == 1, np.fmax(self.peak, price), np.fmin(self.peak, price)), self.peak)
+            changed = np.flatnonzero(is_open & (peak != self.peak))
+            self.peak = peak
+            self.pnl = np.where(is_open, pnl_raw * self.leverage * self.margin, self.pnl)
+            # Trailing Stop V10 Kuralları (%1 kar sonrası %0.5 takip)
+            trailing = is_open & (pnl_raw >= self.ts_trigger) & (side * (peak - price) / peak >= self.ts_offset)
+            stop = is_open & ~trailing & (pnl_raw <= -self.sl)
+        # Yalnızca zirvesi değişen satırlar sözlüğe yansıtılır
+        for i in changed:
+            self.trades[i]["peak"] = float(peak[i])
+        return [(i, "Trailing Stop") for i in np.flatnonzero(trailing)] + [(i, "Stop Loss") for i in np.flatnonzero(stop)]
+
+if __name__ == "__main__":
+    # Parite: check_exit ile aynı çıkışlar; ardından varyant sayısına göre tik başı süre
+    import time
+    from strateji import check_exit
+    rng = np.random.default_rng(7)
+    prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.0005, 20_000)))
+    base = {"id": 1, "name": "V", "balance": 250.0, "active_trade": None,
+            "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005},
+            "variants": {"sl": np.linspace(0.005, 0.03, 10).round(4).tolist(),
+                         "ts_trigger": np.linspace(0.002, 0.02, 10).round(4).tolist(),
+                         "ts_offset": np.linspace(0.001, 0.01, 10).round(4).tolist()}}
+
+    def run(n_ticks, loop):
+        bots = expand_variants([base])
+        table = BotTable(bots)
+        exits, t0 = [], time.perf_counter()
+        for t, price in enumerate(prices[:n_ticks].tolist()):
+            if t % 50 == 0:  # her 50 tikte boştaki botlar yeniden girer (mum kapanışı benzeri)
+                for b in bots:
+                    if not b["active_trade"]:
+                        b["active_trade"] = {"side": "LONG" if t % 100 else "SHORT", "entry": price, "peak": price, "margin": 100.0, "time": t}
+                        if not loop: table.track(b)
+            if loop:
+                hits = [(b, r) for b in bots if b["active_trade"] and (r := check_exit(b["active_trade"], b["settings"], price))]
+            else:
+                hits = [(bots[i], r) for i, r in table.step(price, ts=t)]
+            for b, r in hits:
+                exits.append((t, b["id"], r)); b["active_trade"] = None
+                if not loop: table.track(b)
+        return sorted(exits), (time.perf_counter() - t0) / n_ticks * 1e6
+
+    ref, loop_us = run(5000, loop=True)
+    got, table_us = run(5000, loop=False)
+    print(f"{len(expand_variants([base]))} varyant, {len(ref)} cikis, parite: {'OK' if ref == got else 'FARK'}")
+    print(f"tik basina: dongu {loop_us:.0f} us, tablo {table_us:.0f} us")
@@ -4,6 +4,8 @@ import os
 import uvicorn
 import asyncio
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import time
 import platform
 
@@ -14,46 +16,23 @@ if platform.system() == "Windows":
     pass
 
 from database_manager import DatabaseManager
+from bot_tablosu import expand_variants
+from durum_gunlugu import StateJournal
 from youtube_extractor import extract_channel_videos
 import json
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 STATE_FILE = os.path.join(BASE_DIR, "quadrant_state.json")
 
-def save_state():
-    """Sistem durumunu diske kaydeder."""
-    try:
-        # Sadece kalıcı olması gereken verileri seç
-        persistent_data = {
-            "status": SYSTEM_STATE["status"],
-            "bots": SYSTEM_STATE["bots"]
-        }
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(persistent_data, f, indent=4)
-    except Exception as e:
-        print(f"Error saving state: {e}")
+JOURNAL = StateJournal(STATE_FILE)  # snapshot + quadrant_state.journal (durum_gunlugu)
+
+def save_state(bots=None):
+    """Değişen botları (verilmezse tümünü) durum günlüğüne işaretler; diske arka planda toplu yazılır."""
+    JOURNAL.mark(SYSTEM_STATE["status"], SYSTEM_STATE["bots"] if bots is None else bots)
 
 def load_state():
-    """Sistem durumunu diskten yükler."""
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                SYSTEM_STATE["status"] = data.get("status", SYSTEM_STATE["status"])
-                # Bot ayarlarını koru ama durumları (balance, pnl, active_trade) diskten al
-                if "bots" in data:
-                    for i, saved_bot in enumerate(data["bots"]):
-                        if i < len(SYSTEM_STATE["bots"]):
-                            SYSTEM_STATE["bots"][i].update({
-                                "balance": saved_bot.get("balance", 250.0),
-                                "pnl": saved_bot.get("pnl", 0.0),
-                                "active_trade": saved_bot.get("active_trade"),
-                                "active": saved_bot.get("active", False)
-                            })
-            return True
-        except Exception as e:
-            print(f"Error loading state: {e}")
-    return False
+    """Sistem durumunu snapshot + günlükten yükler."""
+    return JOURNAL.load(SYSTEM_STATE)
 
 # --- Global System State (Ana Gemi Belleği) ---
 SYSTEM_STATE = {
@@ -62,41 +41,48 @@ SYSTEM_STATE = {
         "total_pnl": 0.0,
         "global_balance": 2000.0, # 8 bot için 250*8
     },
+    # Bot kuralları: "indicators" (strateji.RULES adları, sweep kombinasyonlarıyla aynı)
+    # ya da doğrudan "rules": {"long": "WILLR_14 < -80 & ER_10 > 0.5", "short": "..."}
+    # "symbol": işlem çifti (yoksa BTC/USDT); aynı sembol+timeframe botları tek mum tamponunu paylaşır
+    # "variants": {"sl": [...], "ts_trigger": [...], "ts_offset": [...]} -> her kombinasyon ayrı bot (bot_tablosu)
     "bots": [
         {
-            "id": 1, "name": "Quadrans-A", "active": False, "balance": 250.0, "pnl": 0.0,
-            "strategy": "5m STOCH+HMA", "active_trade": None, "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005}
+            "id": 1, "name": "Quadrans-A", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
+            "strategy": "5m STOCH+HMA", "active_trade": None, "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005},
+            "indicators": ["STOCH"]
         },
         {
-            "id": 2, "name": "Quadrans-B", "active": False, "balance": 250.0, "pnl": 0.0,
-            "strategy": "15m WILLR+ER", "active_trade": None, "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005}
+            "id": 2, "name": "Quadrans-B", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
+            "strategy": "15m WILLR+ER", "active_trade": None, "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005},
+            "indicators": ["WILLR"]
         },
         {
-            "id": 4, "name": "Quadrans-D", "active": False, "balance": 250.0, "pnl": 0.0,
-            "strategy": "4h RSI+MACD", "active_trade": None, "settings": {"sl": 0.04, "ts_trigger": 0.02, "ts_offset": 0.01}
+            "id": 4, "name": "Quadrans-D", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
+            "strategy": "4h RSI+MACD", "active_trade": None, "settings": {"sl": 0.04, "ts_trigger": 0.02, "ts_offset": 0.01},
+            "indicators": ["RSI"]
         },
         {
-            "id": 5, "name": "THE-KING-15m", "active": False, "balance": 250.0, "pnl": 0.0,
+            "id": 5, "name": "THE-KING-15m", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
             "strategy": "15m WILLR+ER_10 (V10)", "active_trade": None, "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005},
             "type": "V10", "indicators": ["WILLR", "ER"]
         },
         {
-            "id": 6, "name": "V10-5m-Mega", "active": False, "balance": 250.0, "pnl": 0.0,
+            "id": 6, "name": "V10-5m-Mega", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
             "strategy": "5m ADX+WILLR+AO+MOM+CCI", "active_trade": None, "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005},
             "type": "V10", "indicators": ["ADX", "WILLR", "AO", "MOM", "CCI"]
         },
         {
-            "id": 7, "name": "V10-30m-Mega", "active": False, "balance": 250.0, "pnl": 0.0,
+            "id": 7, "name": "V10-30m-Mega", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
             "strategy": "30m WILLR (V10)", "active_trade": None, "settings": {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005},
             "type": "V10", "indicators": ["WILLR"]
         },
         {
-            "id": 8, "name": "V10-1h-Trend", "active": False, "balance": 250.0, "pnl": 0.0,
+            "id": 8, "name": "V10-1h-Trend", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
             "strategy": "1h RSI+EMA (V10)", "active_trade": None, "settings": {"sl": 0.03, "ts_trigger": 0.015, "ts_offset": 0.007},
             "type": "V10", "indicators": ["RSI", "EMA"]
         },
         {
-            "id": 9, "name": "V10-4h-Trend", "active": False, "balance": 250.0, "pnl": 0.0,
+            "id": 9, "name": "V10-4h-Trend", "symbol": "BTC/USDT", "active": False, "balance": 250.0, "pnl": 0.0,
             "strategy": "4h RSI+ADX+WILLR+ER (V10)", "active_trade": None, "settings": {"sl": 0.04, "ts_trigger": 0.02, "ts_offset": 0.01},
             "type": "V10", "indicators": ["RSI", "ADX", "WILLR", "ER"]
         }
@@ -106,6 +92,9 @@ SYSTEM_STATE = {
     "last_update": 0
 }
 
+SYSTEM_STATE["bots"] = expand_variants(SYSTEM_STATE["bots"])
+MANUAL_EXITS = set()  # manuel kapatma emri verilen bot id'leri (risk döngüsü tüketir)
+
 # Açılışta eski durumu yükle
 load_state()
 
@@ -117,8 +106,10 @@ HISTORY_CSV = os.path.join(BASE_DIR, "sampiyon_islemler_history.csv")
 
 # --- Workers (Arka Plan Isçileri) ---
 
+LOG_PENDING = []  # dosyaya yazılmayı bekleyen satırlar (log_worker toplu yazar)
+
 def log_message(msg):
-    """Hem bellege hem de dosyaya log yazar."""
+    """Hem bellege hem de dosyaya log yazar (dosyaya log_worker ile toplu)."""
     from datetime import datetime
     timestamp = datetime.now().strftime('%H:%M:%S')
     formatted_msg = f"[{timestamp}] {msg}"
@@ -127,10 +118,18 @@ def log_message(msg):
     if len(SYSTEM_STATE["logs"]) > 50:
         SYSTEM_STATE["logs"].pop(0)
     
-    # Dosyaya ekle
+    # Dosyaya eklenecekler kuyruğa (yüzlerce varyant aynı mumda girip çıkınca her satır için dosya açılmaz)
+    LOG_PENDING.append(formatted_msg)
+
+def flush_logs():
+    """Bekleyen log satırlarını tek açılış ve tek yazımla dosyaya ekler."""
+    if not LOG_PENDING:
+        return
+    lines = LOG_PENDING[:]
+    del LOG_PENDING[:]
     try:
         with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(formatted_msg + "\n")
+            f.write("\n".join(lines) + "\n")
     except:
         pass
 
@@ -150,193 +149,256 @@ async def metrics_worker():
     """Veritabanini ve metrikleri günceller."""
     while True:
         try:
-            # CSV'den verileri veritabanına taşı
-            db.sync_from_csv(CSV_FILE)
+            # CSV'lere son turdan beri eklenen satırları veritabanına taşı (ayrı iş parçacığında, API bloklanmaz)
+            await asyncio.to_thread(db.sync_from_csv, CSV_FILE)
             if os.path.exists(HISTORY_CSV):
-                db.sync_from_csv(HISTORY_CSV)
+                await asyncio.to_thread(db.sync_from_csv, HISTORY_CSV)
         except Exception as e:
             log_message(f"Worker Error (Metrics): {e}")
         await asyncio.sleep(60)
 
+async def loop_lag_worker(interval=0.1):
+    """Olay döngüsü gecikmesi göstergesi: planlanan uyanma ile gerçek uyanma arasındaki fark (son ~60 sn)."""
+    window = deque(maxlen=int(60 / interval))
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        window.append((time.perf_counter() - t0 - interval) * 1000)
+        ordered = sorted(window)
+        SYSTEM_STATE["loop_lag"] = {
+            "last_ms": round(window[-1], 1),
+            "p99_ms": round(ordered[int(len(ordered) * 0.99)], 1),
+            "max_ms": round(ordered[-1], 1),
+        }
+
 async def log_worker():
-    """Log dosyasini takip eder."""
+    """Bekleyen log satırlarını saniyede bir dosyaya yazar."""
     while True:
-        await asyncio.sleep(60)
+        await asyncio.sleep(1)
+        flush_logs()
 
 async def virtual_trader_worker():
     """Quadrant Engine: 4 bot'u aynı anda yöneten profesyonel risk motoru."""
     import ccxt.async_support as ccxt_async
-    import pandas as pd
-    import pandas_ta as ta
-    from database_manager import DatabaseManager
+    from mum_tamponu import CandleBuffer, resolve_streams, timeframe_seconds, OHLCV_COLUMNS, LIVE_COLUMNS
+    from strateji import plan_for, required_columns, rule_error
+    from bot_tablosu import BotTable
+    from fiyat_akisi import make_feed
     from datetime import datetime
     
-    db = DatabaseManager()
     exch = ccxt_async.gateio()  # Gate.io yerine Binance (Amerika IP engeli yok)
-    symbol = 'BTC/USDT'
+    default_symbol = 'BTC/USDT'  # "symbol" alanı olmayan botlar için
     margin = 100.0
     leverage = 50
+    buffers = {}  # (symbol, timeframe) -> CandleBuffer; aynı gruptaki botlar tamponu paylaşır
+    plans = {}  # (kural grupları, tampon) -> (tampon düzeni, derlenmiş strateji planı); varyantlar paylaşır
+    open_by_symbol = {}  # symbol -> o sembolde işlem yapan botlar (risk döngüleri için)
+    tables = {}  # symbol -> BotTable (tikte tüm varyantlar dizi işlemleriyle)
+    risk_tasks = {}  # symbol -> fiyat akışını dinleyen görev
+    close_idx = OHLCV_COLUMNS.index('close')
+    # 40 sembol x 5 timeframe'e kadar tek turda: istekler sınırlı eşzamanlılıkla dalgalar halinde gider
+    fetch_slots = asyncio.Semaphore(int(os.getenv('FETCH_CONCURRENCY', 10)))
+    fetch_timeout = 10.0
+    # Tampon ısınması / akış oynatma saf Python döngüsüdür: iş parçacığında koşar, olay döngüsü API'ye cevap vermeye devam eder
+    cpu_threads = ThreadPoolExecutor(max_workers=2, thread_name_prefix="quadrant")
+    candle_grace = float(os.getenv('CANDLE_GRACE_SEC', 2.0))  # mum kapanışından sonra borsaya tanınan süre
+    feed = make_feed(exch)  # trailing stop / stop loss için canlı fiyat akışı (PRICE_FEED)
     
-    log_message("⚔️ KRIPTO KULE: Quadrant Müfrezesi Mevzileniyor (8 Bot Nöbette)")
-    
-    while True:
+    def disable_bot(bot, error):
+        """Kuralı derlenemeyen botu sinyal döngüsünden çıkarır; sebep /bots'ta _rule_error olarak görünür."""
+        if bot.get("_rule_error") != error:
+            bot["_rule_error"] = error
+            log_message(f"⛔ [{bot['name']}] devre dışı: {error}")
+
+    def bot_groups():
+        """(symbol, timeframe) -> (kuralların okuduğu kolonlar, botlar); sembol bazlı bot listesini de tazeler."""
+        groups = {}
+        by_symbol = {}
+        for b in SYSTEM_STATE["bots"]:
+            sym = b.get("symbol", default_symbol)
+            by_symbol.setdefault(sym, []).append(b)  # açık pozisyonun risk takibi kural hatasından bağımsız
+            # Canlıda derlenemeyen kural (akışı olmayan indikatör vb.) sessizce zayıflatılmaz: bot sinyal üretmez
+            error = rule_error(b, LIVE_COLUMNS)
+            if error:
+                disable_bot(b, error)
+                continue
+            b.pop("_rule_error", None)
+            wanted, members = groups.setdefault((sym, b["strategy"].split(" ")[0]), (set(), []))
+            wanted.update(required_columns(b)); members.append(b)
+        open_by_symbol.clear(); open_by_symbol.update(by_symbol)
+        return groups
+
+    async def refresh(key):
+        """Tamponu günceller; hata/zaman aşımı döngüyü durdurmaz, (anahtar, hata) döner."""
         try:
-            # Tüm gerekli timeframe'leri belirle
-            timeframes = list(set([b["strategy"].split(" ")[0] for b in SYSTEM_STATE["bots"]]))
-            ohlcv_data = {}
-            
-            for tf in timeframes:
-                ohlcv = await exch.fetch_ohlcv(symbol, timeframe=tf, limit=100)
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                # Teknik Göstergeler (V10 Destekli Tam Set)
-                try:
-                    df.ta.rsi(append=True); df.ta.macd(append=True); df.ta.adx(append=True)
-                    df.ta.stoch(append=True); df.ta.willr(append=True); df.ta.supertrend(append=True)
-                    df.ta.ema(length=20, append=True); df.ta.ema(length=50, append=True)
-                    df.ta.er(append=True); df.ta.ao(append=True); df.ta.mom(append=True); df.ta.cci(append=True); df.ta.mfi(append=True)
-                except: pass
-                df.ffill(inplace=True)
-                ohlcv_data[tf] = df
-
-            # Botları Döngüye Al
-            for bot in SYSTEM_STATE["bots"]:
-                tf = bot["strategy"].split(" ")[0]
-                df = ohlcv_data.get(tf)
-                if df is None: continue
-                
-                curr_price = df['close'].iloc[-1]
-                active = bot.get("active_trade")
-                
-                # --- SİNYAL ÜRETİMİ (V10 Özelleştirilmiş) ---
-                signal = "WAIT"
-                
-                if bot.get("type") == "V10":
-                    # V10 Sinyal Mantığı: Belirtilen tüm indikatörlerin kesişimi
-                    long_conds = []
-                    short_conds = []
-                    
-                    for ind in bot["indicators"]:
-                        # Sütun isimlerini güvenli bul (Pandas-TA isimlendirmeleri değişkendir)
-                        col = next((c for c in df.columns if c.lower().startswith(ind.lower())), None)
-                        if not col: continue
-                        
-                        if ind == "RSI": 
-                            long_conds.append(df[col].iloc[-1] < 30); short_conds.append(df[col].iloc[-1] > 70)
-                        elif ind == "MACD":
-                            col_h = next((c for c in df.columns if 'MACDh' in c), col)
-                            long_conds.append(df[col_h].iloc[-1] > 0); short_conds.append(df[col_h].iloc[-1] < 0)
-                        elif ind == "ADX":
-                            long_conds.append(df[col].iloc[-1] > 25) # Trend gücü (Yön için fiyata bakılırsa V10 kuralı)
-                            long_conds.append(df['close'].iloc[-1] > df['close'].iloc[-2])
-                            short_conds.append(df[col].iloc[-1] > 25)
-                            short_conds.append(df['close'].iloc[-1] < df['close'].iloc[-2])
-                        elif ind == "WILLR":
-                            long_conds.append(df[col].iloc[-1] < -80); short_conds.append(df[col].iloc[-1] > -20)
-                        elif ind == "EMA":
-                            long_conds.append(df['EMA_20'].iloc[-1] > df['EMA_50'].iloc[-1])
-                            short_conds.append(df['EMA_20'].iloc[-1] < df['EMA_50'].iloc[-1])
-                        elif ind == "AO":
-                            long_conds.append(df[col].iloc[-1] > 0); short_conds.append(df[col].iloc[-1] < 0)
-                        elif ind == "MOM":
-                            long_conds.append(df[col].iloc[-1] > 0); short_conds.append(df[col].iloc[-1] < 0)
-                        elif ind == "CCI":
-                            long_conds.append(df[col].iloc[-1] < -100); short_conds.append(df[col].iloc[-1] > 100)
-                        elif ind == "ER":
-                            long_conds.append(df[col].iloc[-1] > 0.5); short_conds.append(df[col].iloc[-1] > 0.5)
-
-                    if long_conds and all(long_conds): signal = "LONG"
-                    elif short_conds and all(short_conds): signal = "SHORT"
-                else:
-                    # Orijinal Bot Mantıkları (A, B, D)
-                    if "STOCH" in bot["strategy"]:
-                        col = next((c for c in df.columns if 'STOCHk' in c), None)
-                        if col:
-                            if df[col].iloc[-1] < 20: signal = "LONG"
-                            elif df[col].iloc[-1] > 80: signal = "SHORT"
-                    elif "WILLR" in bot["strategy"] and bot.get("id") == 2: # Bot B
-                        col = next((c for c in df.columns if 'WILLR' in c), None)
-                        if col:
-                            if df[col].iloc[-1] < -80: signal = "LONG"
-                            elif df[col].iloc[-1] > -20: signal = "SHORT"
-                    elif "RSI" in bot["strategy"] and bot.get("id") == 4: # Bot D
-                        col = next((c for c in df.columns if 'RSI' in c), None)
-                        if col:
-                            if df[col].iloc[-1] < 30: signal = "LONG"
-                            elif df[col].iloc[-1] > 70: signal = "SHORT"
-
-                if not active:
-                    if signal in ["LONG", "SHORT"]:
-                        # Bileşik Getiri Kuralı (V10 için)
-                        current_margin = margin
-                        if bot.get("type") == "V10" and bot["balance"] >= 1000:
-                            last_pnl = bot.get("_last_pnl_val", 0)
-                            current_margin = margin + max(0, last_pnl)
-                            current_margin = min(current_margin, bot["balance"] * 0.5)
-
-                        bot["active_trade"] = {
-                            "side": signal, "entry": curr_price, "peak": curr_price,
-                            "margin": current_margin,
-                            "start_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                        save_state()
-                        log_message(f"🚀 [{bot['name']}] {signal} GIRILDI @ {curr_price} (M: {round(current_margin,1)}$)")
-                else:
-                    # RISK YÖNETİMİ
-                    entry = active["entry"]
-                    peak = active["peak"]
-                    side = active["side"]
-                    settings = bot["settings"]
-                    current_margin = active.get("margin", margin)
-                    
-                    pnl_raw = (curr_price - entry) / entry if side == "LONG" else (entry - curr_price) / entry
-                    
-                    if side == "LONG": active["peak"] = max(peak, curr_price)
-                    else: active["peak"] = min(peak, curr_price)
-                    
-                    is_exit = False
-                    reason = ""
-                    
-                    # Trailing Stop V10 Kuralları (%1 kar sonrası %0.5 takip)
-                    if pnl_raw >= settings["ts_trigger"]:
-                        ts_check = (active["peak"] - curr_price) / active["peak"] if side == "LONG" else (curr_price - active["peak"]) / active["peak"]
-                        if ts_check >= settings["ts_offset"]:
-                            is_exit = True; reason = "Trailing Stop"
-                    
-                    if not is_exit:
-                        if pnl_raw <= -settings["sl"]: 
-                            is_exit = True; reason = "Stop Loss"
-                        elif (side == "LONG" and signal == "SHORT") or (side == "SHORT" and signal == "LONG"):
-                            is_exit = True; reason = "Ters Sinyal"
-                        elif bot.get("_manual_exit"):
-                            is_exit = True; reason = "Manuel Kapatma"
-                            bot["_manual_exit"] = False
-                    
-                    if is_exit:
-                        profit = pnl_raw * leverage * current_margin
-                        bot["balance"] += profit
-                        bot["pnl"] += profit
-                        bot["_last_pnl_val"] = profit
-                        SYSTEM_STATE["status"]["total_pnl"] += profit
-                        
-                        try:
-                            db.log_virtual_trade(
-                                bot_name=bot["name"],
-                                entry_time=active["start_time"],
-                                exit_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                                side=side, entry_price=entry, exit_price=curr_price,
-                                pnl=profit, balance=bot["balance"]
-                            )
-                        except Exception as e:
-                            log_message(f"İşlem Kayıt Hatası: {e}")
-                        bot["active_trade"] = None
-                        save_state()
-                        log_message(f"🏁 [{bot['name']}] {side} KAPANDI ({reason}) | PnL: {round(profit,2)}$")
-            
-            save_state()
+            async with fetch_slots:
+                await asyncio.wait_for(buffers[key].refresh(exch, key[0], cpu_threads), timeout=fetch_timeout)
+            return key, None
         except Exception as e:
-            log_message(f"⚠️ Quadrant Engine Hata: {str(e)}")
-            
-        await asyncio.sleep(30)
+            return key, e
+
+    def close_trade(bot, price, reason):
+        active = bot["active_trade"]
+        entry, side = active["entry"], active["side"]
+        pnl_raw = (price - entry) / entry if side == "LONG" else (entry - price) / entry
+        profit = pnl_raw * leverage * active.get("margin", margin)
+        bot["balance"] += profit
+        bot["pnl"] += profit
+        bot["_last_pnl_val"] = profit
+        SYSTEM_STATE["status"]["total_pnl"] += profit
+        
+        try:
+            db.log_virtual_trade(
+                bot_name=bot["name"],
+                entry_time=active["start_time"],
+                exit_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                side=side, entry_price=entry, exit_price=price,
+                pnl=profit, balance=bot["balance"]
+            )
+        except Exception as e:
+            log_message(f"İşlem Kayıt Hatası: {e}")
+        bot["active_trade"] = None
+        save_state([bot])
+        log_message(f"🏁 [{bot['name']}] {side} KAPANDI ({reason}) | PnL: {round(profit,2)}$")
+
+    def risk_step(table, price, ts=None):
+        """RISK YÖNETİMİ (her fiyat tikinde): zirve takibi, trailing stop, stop loss tüm satırlarda; ardından manuel kapatma."""
+        for i, reason in table.step(price, ts):
+            bot = table.bots[i]
+            # Tablo dışında (reset vb.) değişen satır: kapatmadan önce tazele
+            if bot.get("active_trade") is table.trades[i]:
+                close_trade(bot, price, reason)
+            table.track(bot)
+        for bot_id in MANUAL_EXITS & table.index.keys():
+            MANUAL_EXITS.discard(bot_id)
+            bot = table.bots[table.index[bot_id]]
+            if bot.get("_manual_exit") and bot.get("active_trade"):
+                bot["_manual_exit"] = False
+                close_trade(bot, price, "Manuel Kapatma")
+                table.track(bot)
+
+    def signal_step(bot, buf, rows, signals):
+        """Mum kapanışında: sinyal üretir; pozisyon yoksa giriş, ters sinyalde çıkış yapar.
+        signals: bu mumda hesaplanmış plan -> sinyal (aynı kural setli varyantlar planı bir kez değerlendirir)."""
+        curr_price = rows[-1, close_idx]
+        active = bot.get("active_trade")
+        
+        # --- SİNYAL ÜRETİMİ: derlenmiş plan (tüm indikatör koşullarının kesişimi) ---
+        try:
+            plan = plan_for(bot, buf, plans)
+            signal = signals.get(plan)
+            if signal is None:
+                signal = signals[plan] = plan.signal(rows)
+        except ValueError as e:
+            disable_bot(bot, str(e))
+            return
+
+        if not active:
+            if signal in ["LONG", "SHORT"]:
+                # Bileşik Getiri Kuralı (V10 için)
+                current_margin = margin
+                if bot.get("type") == "V10" and bot["balance"] >= 1000:
+                    last_pnl = bot.get("_last_pnl_val", 0)
+                    current_margin = margin + max(0, last_pnl)
+                    current_margin = min(current_margin, bot["balance"] * 0.5)
+
+                bot["active_trade"] = {
+                    "side": signal, "entry": curr_price, "peak": curr_price,
+                    "margin": current_margin,
+                    "time": int(time.time() * 1000),  # risk döngüsü bundan eski tikleri bu pozisyona uygulamaz
+                    "start_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                }
+                tables[bot.get("symbol", default_symbol)].track(bot)
+                save_state([bot])
+                log_message(f"🚀 [{bot['name']}] {signal} GIRILDI {bot.get('symbol', default_symbol)} @ {curr_price} (M: {round(current_margin,1)}$)")
+        elif (active["side"] == "LONG" and signal == "SHORT") or (active["side"] == "SHORT" and signal == "LONG"):
+            close_trade(bot, curr_price, "Ters Sinyal")
+            tables[bot.get("symbol", default_symbol)].track(bot)
+
+    async def candle_scheduler():
+        """Her (sembol, timeframe) grubunu kendi mum kapanışında (+ tolerans) uyandırır."""
+        boundary = {}  # grup -> sıradaki kapanış (sn); ilk turda tampon yalnızca ısıtılır
+        retry_at = {}  # grup -> çekme hatasından sonra yeniden deneme zamanı
+        error_backoff = 0.0  # tur hata verdiyse bir sonraki tura kadar en az bu kadar beklenir (5 sn'den 60 sn'ye katlanır)
+        while True:
+            try:
+                groups = bot_groups()
+                for key, (wanted, _) in groups.items():
+                    # Teknik Göstergeler: yalnızca gereken birleşim, artımlı güncellenir
+                    needed = resolve_streams(wanted)
+                    if key not in buffers:
+                        buffers[key] = CandleBuffer(key[1], needed)
+                    elif needed != buffers[key].indicators:
+                        await asyncio.get_running_loop().run_in_executor(cpu_threads, buffers[key].ensure, needed)
+                for key in list(boundary):
+                    if key not in groups: del boundary[key]
+                for sym, members in open_by_symbol.items():
+                    # Bot listesi değişmediyse yalnızca dış değişiklikler (reset) okunur
+                    if sym in tables and tables[sym].matches(members): tables[sym].sync()
+                    else: tables[sym] = BotTable(members, leverage)
+                    # Tekrar akışı bitince görev normal döner; yalnızca hatayla biten görev yeniden başlatılır
+                    task = risk_tasks.get(sym)
+                    if task is None or (task.done() and not task.cancelled() and task.exception() is not None):
+                        risk_tasks[sym] = asyncio.create_task(risk_loop(sym))
+
+                now = time.time()
+                due = [key for key in groups
+                       if boundary.get(key, 0) + candle_grace <= now and retry_at.get(key, 0) <= now]
+                # Due gruplar eşzamanlı çekilir; gelen grubun botları diğerlerini beklemeden işlenir
+                for done in asyncio.as_completed([refresh(key) for key in due]):
+                    key, error = await done
+                    if error is not None:
+                        log_message(f"⚠️ Veri Çekme Hatası ({key[0]} {key[1]}): {type(error).__name__} {error}")
+                        retry_at[key] = time.time() + 5
+                        continue
+                    if key in boundary:
+                        # Değerlendirme kapanan mum üzerinde yapılır (yeni açılan mum hariç)
+                        rows = buffers[key].closed_values(boundary[key] * 1000)
+                        signals = {}
+                        for bot in groups[key][1]:
+                            signal_step(bot, buffers[key], rows, signals)
+                    period = timeframe_seconds(key[1])
+                    boundary[key] = (now // period + 1) * period
+                    retry_at.pop(key, None)
+                # Açık pozisyonların zirveleri tik ile değişir; tur sonunda yalnızca onlar işaretlenir
+                save_state([b for b in SYSTEM_STATE["bots"] if b.get("active_trade")])
+            except Exception as e:
+                error_backoff = min(max(error_backoff * 2, 5.0), 60.0)
+                log_message(f"⚠️ Quadrant Engine Hata: {str(e)} ({error_backoff:.0f} sn sonra tekrar)")
+            else:
+                error_backoff = 0.0
+            # Bot ayarı değişirse en geç 60 sn içinde yeni gruplar devreye girer
+            wake = min([b + candle_grace for b in boundary.values()] + list(retry_at.values()) + [time.time() + 60])
+            # Geçmişte kalan boundary (adım hata verdi) sıcak döngüye dönmesin
+            await asyncio.sleep(max(error_backoff, wake - time.time()))
+
+    async def risk_loop(symbol):
+        """Sembolün fiyat akışındaki her tikte açık pozisyonların risk kurallarını işletir (indikatör döngüsünden bağımsız)."""
+        def has_open():
+            table = tables.get(symbol)
+            return table is not None and table.has_open()
+
+        while True:
+            try:
+                async for ts, price in feed.stream(symbol, has_open):
+                    # Akış tüketilmeye devam eder (websocket'te uyunursa tikler birikip girişten sonra eski fiyatla işlenir)
+                    if not has_open():
+                        continue
+                    risk_step(tables[symbol], price, ts)
+                log_message(f"Fiyat akışı sona erdi ({symbol}, tekrar kaynağı).")
+                return
+            except Exception as e:
+                log_message(f"⚠️ Risk Döngüsü Hata ({symbol}): {type(e).__name__} {e}")
+                await asyncio.sleep(1)
+
+    log_message(f"⚔️ KRIPTO KULE: Quadrant Müfrezesi Mevzileniyor ({len(SYSTEM_STATE['bots'])} Bot, {len(bot_groups())} Sembol/Zaman Grubu Nöbette)")
+    try:
+        await candle_scheduler()
+    finally:
+        # Kapanışta risk döngüleri de durur; son flush'tan sonra pozisyon kapatmasınlar
+        for task in risk_tasks.values():
+            task.cancel()
+        await asyncio.gather(*risk_tasks.values(), return_exceptions=True)
 
 
 @asynccontextmanager
@@ -360,6 +422,9 @@ async def lifespan(app: FastAPI):
     }
     
     workers = [
+        asyncio.create_task(JOURNAL.run()),
+        asyncio.create_task(db.run_writer()),  # işlem kayıtları kuyruktan toplu yazılır
+        asyncio.create_task(loop_lag_worker()),
         asyncio.create_task(arbitrage_worker(persistent_exchanges)),
         asyncio.create_task(metrics_worker()),
         asyncio.create_task(log_worker()),
@@ -372,6 +437,11 @@ async def lifespan(app: FastAPI):
     # Shutdown: Motorlari durdur ve baglantilari kapat
     for worker in workers:
         worker.cancel()
+    # Yarım kalan yazımlar (iş parçacığındaki toplu yazım dahil) bitmeden son flush yapılmaz
+    await asyncio.gather(*workers, return_exceptions=True)
+    flush_logs()
+    JOURNAL.flush()  # bekleyen değişiklikler + son snapshot
+    db.flush()
     for exch in persistent_exchanges.values():
         await exch.close()
 
@@ -397,6 +467,7 @@ async def root():
             "logs": "/logs - Sistem gunlukleri",
             "arbitrage": "/arbitrage - Arbitraj firsatlari",
             "history": "/history - Islem gecmisi (DB)",
+            "stats": "/stats - Bot bazli performans ozeti",
             "control": "/control/status - Detayli kontrol verisi"
         },
         "health": "Live"
@@ -412,6 +483,7 @@ async def get_status():
         "total_pnl": round(SYSTEM_STATE["status"]["total_pnl"], 2),
         "global_balance": round(SYSTEM_STATE["status"]["global_balance"], 2),
         "bot_count": len(SYSTEM_STATE["bots"]),
+        "loop_lag": SYSTEM_STATE.get("loop_lag"),  # olay döngüsü gecikmesi (ms)
         "last_update": turkey_time
     }
 
@@ -420,25 +492,47 @@ async def get_bots():
     """Bireysel bot durumlarini döner."""
     return {"bots": SYSTEM_STATE["bots"]}
 
+@app.get("/stats")
+async def get_stats():
+    """Bot bazlı performans özeti (bot_stats tablosu; maliyet geçmiş boyutundan bağımsız)."""
+    return {"bots": await asyncio.to_thread(db.get_bot_stats)}
+
+HISTORY_PAGE = 100  # varsayılan sayfa boyu
+HISTORY_STREAM = 1000  # bundan büyük limitler parça parça akıtılır
+HISTORY_MAX = 1_000_000
+
+async def _history_response(bot_name, before_id, limit, since, until, extra):
+    """Geçmiş sayfası; büyük limitlerde JSON'u belleğe almadan akıtır. Sonraki sayfa: ?before_id=next_before_id"""
+    from fastapi.responses import StreamingResponse
+    limit = max(1, min(limit, HISTORY_MAX))
+    if limit <= HISTORY_STREAM:
+        trades = await asyncio.to_thread(db.get_trades, bot_name, before_id, limit, since, until)
+        next_id = trades[-1]["Id"] if len(trades) == limit else None
+        return {**extra, "trades": trades, "next_before_id": next_id}
+
+    def chunks():
+        # Senkron üreteç: Starlette iş parçacığında gezer, olay döngüsü bloklanmaz
+        yield json.dumps(extra)[:-1] + (", " if extra else "") + '"trades": ['
+        last, count = None, 0
+        for trade in db.iter_trades(bot_name, before_id, limit, since, until):
+            yield ("," if count else "") + json.dumps(trade)
+            last, count = trade["Id"], count + 1
+        yield f'], "next_before_id": {json.dumps(last if count == limit else None)}}}'
+    return StreamingResponse(chunks(), media_type="application/json")
+
 @app.get("/history")
-async def get_history():
-    """İşlem geçmişini veritabanından döner."""
-    metrics = db.get_metrics()
-    return {"trades": metrics["trades"], "total_pnl": metrics["total_pnl"], "balance": metrics["balance"]}
+async def get_history(before_id: int = None, limit: int = HISTORY_PAGE, since: str = None, until: str = None):
+    """İşlem geçmişini veritabanından döner (yeniden eskiye, anahtar tabanlı sayfalama)."""
+    # Yalnızca toplamlar okunur (get_metrics'in işlem sorgusu her sayfada tekrar edilmez)
+    totals = await asyncio.to_thread(db.get_totals)
+    return await _history_response(None, before_id, limit, since, until, totals)
 
 @app.get("/history/{bot_name}")
-async def get_bot_history(bot_name: str):
-    """Belirli bir botun işlem geçmişini döner."""
-    # Veritabanındaki tüm işlemleri al
-    all_metrics = db.get_metrics()
-    all_trades = all_metrics["trades"] # Burada 'Bot' key'i kullanılıyor
-    
+async def get_bot_history(bot_name: str, before_id: int = None, limit: int = HISTORY_PAGE, since: str = None, until: str = None):
+    """Belirli bir botun işlem geçmişini döner (ALL: tüm botlar); filtre SQL'de, (bot_name, id) indeksiyle."""
     if bot_name == "ALL":
-        return {"bot_name": "SİSTEM", "trades": all_trades}
-        
-    # Bot ismine göre filtrele
-    bot_trades = [t for t in all_trades if t.get("Bot") == bot_name]
-    return {"bot_name": bot_name, "trades": bot_trades}
+        return await _history_response(None, before_id, limit, since, until, {"bot_name": "SİSTEM"})
+    return await _history_response(bot_name, before_id, limit, since, until, {"bot_name": bot_name})
 
 @app.get("/arbitrage")
 async def get_arbitrage():
@@ -481,6 +575,7 @@ async def manual_sell(data: dict):
     # Şimdilik direkt burada kapatıp loglayalım (Worker bir sonraki döngüde active_trade'i None görecek).
     
     bot["_manual_exit"] = True # Worker'a sinyal gönder
+    MANUAL_EXITS.add(bot_id)
     log_message(f"🚨 [{bot['name']}] MANUEL KAPATMA EMRI VERILDI!")
     return {"status": "success", "message": f"{bot['name']} icin kapatma emri iletildi."}
 
@@ -523,7 +618,7 @@ async def reset_bot(bot_id: int):
     SYSTEM_STATE["status"]["total_pnl"] -= bot["pnl"]
     
     SYSTEM_STATE["logs"].append(f"🔄 {bot['name']} SIFIRLANDI: Bakiye 250$ yapildi.")
-    save_state()
+    save_state([bot])
     return {"status": "success", "message": f"{bot['name']} sifirlandi."}
 
 @app.get("/dashboard")
@@ -853,23 +948,23 @@ async def get_dashboard():
                             </div>
                             <div class="trade-row">
                                 <span class="trade-label">Yön:</span>
-                                <span class="trade-value" style="color: ${t.side === 'LONG' ? 'var(--green)' : 'var(--red)'}">${t.side}</span>
+                                <span class="trade-value" style="color: ${t.Side === 'LONG' ? 'var(--green)' : 'var(--red)'}">${t.Side}</span>
                             </div>
                             <div class="trade-row">
                                 <span class="trade-label">Giriş:</span>
-                                <span class="trade-value">${t.entry_price}$ (${t.entry_time})</span>
+                                <span class="trade-value">${t.Entry}$ (${t.Start})</span>
                             </div>
                             <div class="trade-row">
                                 <span class="trade-label">Çıkış:</span>
-                                <span class="trade-value">${t.exit_price}$ (${t.exit_time})</span>
+                                <span class="trade-value">${t.Exit}$ (${t.Date})</span>
                             </div>
                             <div class="trade-row">
                                 <span class="trade-label">Kar/Zarar:</span>
-                                <span class="trade-value ${t.pnl >= 0 ? 'profit' : 'loss'}">${t.pnl >= 0 ? '+' : ''}${t.pnl.toFixed(2)}$</span>
+                                <span class="trade-value ${t.PnL >= 0 ? 'profit' : 'loss'}">${t.PnL >= 0 ? '+' : ''}${t.PnL.toFixed(2)}$</span>
                             </div>
                             <div class="trade-row">
                                 <span class="trade-label">Bakiye:</span>
-                                <span class="trade-value">${t.balance.toFixed(2)}$</span>
+                                <span class="trade-value">${t.Balance.toFixed(2)}$</span>
                             </div>
                         </div>
                     `).join('');
@@ -1,19 +1,60 @@
 import sqlite3
 import os
 import time
+import asyncio
+import csv
+import hashlib
+import queue
+from contextlib import contextmanager
+
+TRADE_COLUMNS = ("bot_name", "start_time", "end_time", "side", "entry_price", "exit_price", "pnl", "balance")
+# Aynı işlemin iki kez yazılmasını engelleyen doğal anahtar (CSV yeniden okunsa da tekrar eklenmez)
+NATURAL_KEY = ("bot_name", "start_time", "end_time", "side", "entry_price")
+PREFIX_BYTES = 4096  # dosyanın yeniden yazıldığını anlamak için özeti tutulan baş kısım
+
+def _trade_dict(row):
+    """(id, bot_name, start_time, end_time, side, entry, exit, pnl, balance) -> Frontend'in PascalCase keyleri."""
+    return {"Id": row[0], "Bot": row[1], "Start": row[2], "Date": row[3], "Side": row[4],
+            "Entry": row[5], "Exit": row[6], "PnL": row[7], "Balance": row[8]}
+
+def _prefix_hash(f, end):
+    """Dosyanın ilk min(end, PREFIX_BYTES) baytının özeti (aynı inode'da baştan yazılmayı yakalar)."""
+    f.seek(0)
+    return hashlib.sha1(f.read(min(end, PREFIX_BYTES))).hexdigest()
 
 class DatabaseManager:
-    def __init__(self, db_path=None):
+    # Yazma: tek uzun ömürlü bağlantı + kuyruk (run_writer görevi toplu executemany yapar)
+    # Okuma: küçük salt-okunur bağlantı havuzu (WAL sayesinde yazıcıyı beklemez)
+    def __init__(self, db_path=None, readers=3):
         if db_path is None:
             # Scriptin olduğu klasöre göre belirle
             current_dir = os.path.dirname(os.path.abspath(__file__))
             db_path = os.path.join(current_dir, "deepverify.db")
         self.db_path = db_path
         self._initialize_db()
+        self._queue = None  # run_writer çalışırken işlem kuyruğu
+        self._writer = None  # yazıcının uzun ömürlü bağlantısı
+        self._readers = queue.LifoQueue()
+        self._reader_count = readers
 
     def _get_connection(self):
         return sqlite3.connect(self.db_path)
 
+    @contextmanager
+    def _reader(self):
+        """Havuzdan salt-okunur bağlantı ödünç verir (iş parçacıkları arasında paylaşılır, aynı anda tek kullanıcı)."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            if self._readers.qsize() < self._reader_count:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
     def _initialize_db(self):
         """Tablolari olusturur."""
         conn = self._get_connection()
@@ -44,89 +85,246 @@ class DatabaseManager:
             )
         ''')
         
+        # CSV kuyruk takibi: dosya başına okunan bayt, inode ve baş kısım özeti
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_offsets (
+                path TEXT PRIMARY KEY,
+                inode INTEGER,
+                offset INTEGER,
+                prefix_hash TEXT
+            )
+        ''')
+        
+        # Eski sayım tabanlı senkronun bıraktığı kopyalar temizlenir, sonra benzersiz indeks kurulur
+        if not cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_trades_natural'").fetchone():
+            key = ", ".join(NATURAL_KEY)
+            cursor.execute(f"DELETE FROM trades WHERE id NOT IN (SELECT MIN(id) FROM trades GROUP BY {key})")
+            cursor.execute(f"CREATE UNIQUE INDEX idx_trades_natural ON trades ({key})")
+        # Geçmiş sorguları: bot bazlı anahtar sayfalama ve tarih aralığı
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_bot_id ON trades (bot_name, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_end_time ON trades (end_time)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_bot_end ON trades (bot_name, end_time)")
+        
+        # Bot bazlı özet (materialized): trades'e her eklemede tetikleyici günceller, analitik geçmiş boyutundan bağımsız
+        # max_drawdown: kapanış bakiyeleri üzerinden zirveden en büyük düşüş oranı (0.25 = %25)
+        if not cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'bot_stats'").fetchone():
+            cursor.execute('''
+                CREATE TABLE bot_stats (
+                    bot_name TEXT PRIMARY KEY,
+                    trades INTEGER,
+                    wins INTEGER,
+                    total_pnl REAL,
+                    peak_balance REAL,
+                    max_drawdown REAL,
+                    last_balance REAL
+                )
+            ''')
+            # Mevcut geçmişten bir kez doldurulur (koşan zirve pencere fonksiyonuyla)
+            cursor.execute('''
+                WITH running AS (
+                    SELECT bot_name, pnl, balance,
+                           MAX(balance) OVER (PARTITION BY bot_name ORDER BY id) AS peak
+                    FROM trades
+                )
+                INSERT INTO bot_stats
+                SELECT bot_name, COUNT(*), SUM(pnl > 0), SUM(pnl), MAX(balance),
+                       MAX(CASE WHEN peak > 0 THEN (peak - balance) / peak ELSE 0 END),
+                       (SELECT balance FROM trades t WHERE t.bot_name = running.bot_name ORDER BY id DESC LIMIT 1)
+                FROM running WHERE bot_name IS NOT NULL GROUP BY bot_name
+            ''')
+        # UPSERT içinde yalın kolonlar satırın eski değerleridir
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_trades_bot_stats AFTER INSERT ON trades
+            WHEN NEW.bot_name IS NOT NULL
+            BEGIN
+                INSERT INTO bot_stats (bot_name, trades, wins, total_pnl, peak_balance, max_drawdown, last_balance)
+                VALUES (NEW.bot_name, 1, COALESCE(NEW.pnl, 0) > 0, COALESCE(NEW.pnl, 0), NEW.balance, 0, NEW.balance)
+                ON CONFLICT(bot_name) DO UPDATE SET
+                    trades = trades + 1,
+                    wins = wins + (COALESCE(NEW.pnl, 0) > 0),
+                    total_pnl = total_pnl + COALESCE(NEW.pnl, 0),
+                    peak_balance = MAX(peak_balance, NEW.balance),
+                    max_drawdown = MAX(max_drawdown, CASE WHEN MAX(peak_balance, NEW.balance) > 0
+                        THEN (MAX(peak_balance, NEW.balance) - NEW.balance) / MAX(peak_balance, NEW.balance) ELSE 0 END),
+                    last_balance = NEW.balance;
+            END
+        ''')
+        
+        # WAL: okuyucular yazıcıyı, yazıcı okuyucuları bloklamaz (ayar veritabanı dosyasında kalıcıdır)
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.commit()
         conn.close()
 
     def sync_from_csv(self, csv_path):
-        """CSV'den verileri veritabanina aktarir (Eger henuz yoksa)."""
-        import pandas as pd
+        """CSV'ye son okumadan beri eklenen satirlari veritabanina aktarir (bayt ofsetinden devam eder).
+        Dosya kesilir, dondurulur (inode degisir) ya da bastan yazilirsa bastan okunur; kopyalari indeks eler."""
         if not os.path.exists(csv_path):
             return
-            
+        path = os.path.abspath(csv_path)
+        conn = self._get_connection()
         try:
-            # Turkce basliklara sahip CSV'yi oku
-            df = pd.read_csv(csv_path)
-            if df.empty:
-                return
-                
-            # SQLite kolon isimlerine map et (Turkce basliklari dusunerek)
+            st = os.stat(path)
+            saved = conn.execute("SELECT inode, offset, prefix_hash FROM ingest_offsets WHERE path = ?", (path,)).fetchone()
+            with open(path, "rb") as f:
+                offset = 0
+                if saved and saved[0] == st.st_ino and saved[1] <= st.st_size and _prefix_hash(f, saved[1]) == saved[2]:
+                    offset = saved[1]
+                f.seek(offset)
+                chunk = f.read()
+                # Yarım yazılmış son satır bir sonraki okumaya kalır
+                chunk = chunk[:chunk.rfind(b"\n") + 1]
+                if not chunk and offset:
+                    return
+                prefix_hash = _prefix_hash(f, offset + len(chunk))
             # CSV: Giriş Zamanı,Çıkış Zamanı,Yön,Giriş Fiyatı,Çıkış Fiyatı,PnL ($),Bakiye ($)
-            df.columns = ["start_time", "end_time", "side", "entry_price", "exit_price", "pnl", "balance"]
-            df["bot_name"] = "LEGACY_BOT" # Eski datalar icin bot ismi
-            
-            # Mevcut islem sayisini kontrol et
-            conn = self._get_connection()
-            count = conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
-            
-            if len(df) > count:
-                # Sadece yeni satirlari ekle (bot_name'i sona veya dogru siraya koy)
-                new_data = df.iloc[count:][["bot_name", "start_time", "end_time", "side", "entry_price", "exit_price", "pnl", "balance"]]
-                new_data.to_sql('trades', conn, if_exists='append', index=False)
-                print(f"DB: {len(new_data)} yeni islem senkronize edildi.")
-            
-            conn.close()
+            rows, skipped = [], 0
+            lines = chunk.decode("utf-8-sig" if offset == 0 else "utf-8").splitlines()
+            for n, fields in enumerate(csv.reader(lines)):
+                try:
+                    start, end, side, entry, exit_, pnl, balance = fields
+                    rows.append(("LEGACY_BOT", start, end, side, float(entry), float(exit_), float(pnl), float(balance)))
+                except ValueError:
+                    if n or offset:  # dosya başındaki Türkçe başlık hata sayılmaz
+                        skipped += 1
+            with conn:
+                # rowcount yalnızca trades'e eklenenleri sayar (total_changes bot_stats tetikleyicisini de sayardı)
+                added = conn.executemany(
+                    f"INSERT OR IGNORE INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})", rows).rowcount
+                conn.execute("INSERT OR REPLACE INTO ingest_offsets (path, inode, offset, prefix_hash) VALUES (?, ?, ?, ?)",
+                             (path, st.st_ino, offset + len(chunk), prefix_hash))
+            if added or skipped:
+                print(f"DB: {added} yeni islem senkronize edildi" + (f", {skipped} hatali satir atlandi." if skipped else "."))
         except Exception as e:
             print(f"DB Sync Hatasi: {e}")
+        finally:
+            conn.close()
 
     def log_virtual_trade(self, bot_name, entry_time, exit_time, side, entry_price, exit_price, pnl, balance):
-        """Gercek zamanli bir islemi veritabanina kaydeder."""
-        conn = self._get_connection()
+        """Gercek zamanli bir islemi veritabanina kaydeder (yazici calisiyorsa kuyruga alir, beklemez)."""
+        row = (bot_name, entry_time, exit_time, side, entry_price, exit_price, pnl, balance)
+        if self._queue is not None:
+            self._queue.put_nowait(row)
+            return
         try:
-            conn.execute('''
-                INSERT INTO trades (bot_name, start_time, end_time, side, entry_price, exit_price, pnl, balance)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (bot_name, entry_time, exit_time, side, entry_price, exit_price, pnl, balance))
-            conn.commit()
+            self._write_batch([row])
         except Exception as e:
             print(f"DB Log Hatasi: {e}")
-        finally:
-            conn.close()
+
+    def _write_batch(self, rows):
+        """Tek işlemde toplu ekleme (uzun ömürlü bağlantı)."""
+        if self._writer is None:
+            self._writer = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._writer.execute("PRAGMA synchronous=NORMAL")  # WAL'da commit başına fsync gerekmez
+        with self._writer:
+            self._writer.executemany(
+                f"INSERT OR IGNORE INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})", rows)
+
+    def _drain(self, limit):
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return rows
+
+    async def run_writer(self, batch_size=500):
+        """Arka plan yazicisi: kuyruktaki islemleri toplu executemany ile yazar (motor ve API beklemez)."""
+        self._queue = asyncio.Queue()
+        while True:
+            rows = [await self._queue.get()]
+            rows += self._drain(batch_size - 1)
+            write = asyncio.ensure_future(asyncio.to_thread(self._write_batch, rows))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # Kapanis: is parcacigindaki toplu yazim bitmeden flush() ayni baglantiyi kullanmasin/kapatmasin
+                await asyncio.wait([write])
+                raise
+            except Exception as e:
+                print(f"DB Log Hatasi: {e} ({len(rows)} islem yazilamadi)")
+
+    def flush(self):
+        """Kuyrukta kalan islemleri hemen yazar ve yaziciyi kapatir (kapanista, run_writer gorevi beklendikten sonra)."""
+        if self._queue is not None:
+            rows = self._drain(self._queue.qsize())
+            self._queue = None
+            if rows:
+                self._write_batch(rows)
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def get_totals(self, conn=None):
+        """Toplam PnL (bot_stats uzerinden, O(bot)) ve son bakiye (son Id, O(1)); islem listesi olmadan."""
+        if conn is None:
+            with self._reader() as conn:
+                return self.get_totals(conn)
+        total_pnl = conn.execute("SELECT SUM(total_pnl) FROM bot_stats").fetchone()[0] or 0.0
+        last_balance = conn.execute("SELECT balance FROM trades ORDER BY id DESC LIMIT 1").fetchone()
+        last_balance = last_balance[0] if last_balance else 250.0
+        return {"total_pnl": round(total_pnl, 2), "balance": round(last_balance, 2)}
 
     def get_metrics(self):
         """Genel metrikleri doner (Frontend uyumlu keyler ile)."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            # Sadece yeni sanal islem varsa onlari da hesaba kat (veya sadece onlari don)
-            # Simdilik tumunu donelim ama keyleri duzeltelim
-            total_pnl = cursor.execute("SELECT SUM(pnl) FROM trades").fetchone()[0] or 0.0
-            last_balance = cursor.execute("SELECT balance FROM trades ORDER BY id DESC LIMIT 1").fetchone()
-            last_balance = last_balance[0] if last_balance else 250.0
-            
+        with self._reader() as conn:
             # Son 10 islem (Frontend'in bekledigi PascalCase keyler ile)
-            cursor.execute("SELECT * FROM trades ORDER BY id DESC LIMIT 10")
-            rows = cursor.fetchall()
-            
-            trades = []
-            for row in rows:
-                trades.append({
-                    "Bot": row[1], # bot_name
-                    "Date": row[3], # end_time (veya start_time)
-                    "Side": row[4], # side
-                    "Entry": row[5], # entry_price
-                    "Exit": row[6], # exit_price
-                    "PnL": row[7], # pnl
-                    "Balance": row[8] # balance
-                })
-            
-            return {
-                "total_pnl": round(total_pnl, 2),
-                "balance": round(last_balance, 2),
-                "trades": trades
-            }
-        finally:
-            conn.close()
+            return {**self.get_totals(conn), "trades": self.get_trades(limit=10, conn=conn)}
+
+    def get_bot_stats(self):
+        """Bot bazli ozet (bot_stats): islem sayisi, kazanma orani, toplam PnL, zirve bakiye, max drawdown, son bakiye."""
+        with self._reader() as conn:
+            rows = conn.execute("SELECT bot_name, trades, wins, total_pnl, peak_balance, max_drawdown, last_balance "
+                                "FROM bot_stats ORDER BY bot_name").fetchall()
+        return [{"Bot": bot, "Trades": trades, "Wins": wins, "WinRate": round(wins / trades, 4) if trades else 0.0,
+                 "PnL": round(pnl, 2), "PeakBalance": peak, "MaxDrawdown": round(dd or 0.0, 4), "Balance": last}
+                for bot, trades, wins, pnl, peak, dd, last in rows]
+
+    def get_trades(self, bot_name=None, before_id=None, limit=100, since=None, until=None, conn=None):
+        """Islemleri yeniden eskiye doner; anahtar tabanli sayfalama (before_id = onceki sayfanin son Id'si).
+        since/until end_time araligidir; aralik verilirse sira (end_time, id) olur ve before_id var olan bir
+        islem olmalidir (yoksa bos liste). Sira ve sinir ayni indeksten gelir, maliyet tablo boyutundan bagimsizdir."""
+        if conn is None:
+            with self._reader() as conn:
+                return self.get_trades(bot_name, before_id, limit, since, until, conn)
+        where, args = [], []
+        if bot_name is not None:
+            where.append("bot_name = ?"); args.append(bot_name)
+        if since is None and until is None:
+            if before_id is not None:
+                where.append("id < ?"); args.append(before_id)
+            order = "id DESC"
+        else:
+            # Id sirasiyla gezilseydi yalniz until'li sorgu (bot_name, id) indeksinde araligi filtreleyerek tarardi
+            if since is not None:
+                where.append("end_time >= ?"); args.append(since)
+            bound = None
+            if before_id is not None:
+                bound = conn.execute("SELECT end_time FROM trades WHERE id = ?", (before_id,)).fetchone()
+                # Bilinmeyen imlec (silinmis/yanlis Id) ya da end_time'i bos satir: sayfa yok
+                # (ilk sayfaya dusulseydi istemci ayni sayfalari sonsuza kadar gezerdi)
+                if bound is None or bound[0] is None:
+                    return []
+            if bound is not None and (until is None or bound[0] < until):
+                # Imlec until'den dar: ust sinir tek kosul olarak verilir ki indeks aramasi imlecten baslasin
+                where.append("(end_time, id) < (?, ?)"); args += [bound[0], before_id]
+            elif until is not None:
+                where.append("end_time < ?"); args.append(until)
+            order = "end_time DESC, id DESC"
+        sql = ("SELECT id, bot_name, start_time, end_time, side, entry_price, exit_price, pnl, balance FROM trades"
+               + (" WHERE " + " AND ".join(where) if where else "") + f" ORDER BY {order} LIMIT ?")
+        return [_trade_dict(row) for row in conn.execute(sql, (*args, limit))]
+
+    def iter_trades(self, bot_name=None, before_id=None, limit=None, since=None, until=None, chunk=1000):
+        """get_trades'i parca parca gezer (buyuk sonuclari bellege almadan akitmak icin)."""
+        while limit is None or limit > 0:
+            page = self.get_trades(bot_name, before_id, chunk if limit is None else min(chunk, limit), since, until)
+            yield from page
+            if len(page) < chunk:
+                return
+            before_id = page[-1]["Id"]
+            if limit is not None:
+                limit -= len(page)
 
 if __name__ == "__main__":
     db = DatabaseManager()
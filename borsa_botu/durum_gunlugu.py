@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import time
+
+# Durum Günlüğü (write-ahead journal + sıkıştırılmış snapshot)
+# Her değişiklik bot başına bir satır olarak eklenir (append-only, JSON Lines); yazımlar arka plan
+# görevinde debounce edilip tek fsync ile toplu yapılır. Günlük belirli bir boyuta ulaşınca tam durum
+# geçici dosyaya yazılıp rename ile snapshot'ın yerine konur (yarım yazılmış dosya kalmaz), günlük sıfırlanır.
+# Açılışta snapshot okunur, üstüne günlük oynatılır; yarım kalan son satır yok sayılır.
+
+BOT_FIELDS = ("balance", "pnl", "active_trade", "active")  # diske yazılan çalışma alanları
+
+def _fsync_dir(path):
+    # rename'in kalıcı olması için dizin girişi de diske yazılır (Windows'ta desteklenmez)
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_write(path, text):
+    """Geçici dosya + fsync + os.replace: okuyucu ya eski ya yeni dosyayı görür."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path)
+
+class StateJournal:
+    def __init__(self, snapshot_path, debounce=0.5, compact_every=500):
+        self.snapshot_path = snapshot_path
+        self.journal_path = os.path.splitext(snapshot_path)[0] + ".journal"
+        self.debounce = debounce
+        self.compact_every = compact_every  # bu kadar satırdan sonra snapshot alınır
+        self.lines = 0  # günlükteki satır sayısı
+        self.pending = {}  # bot id -> bot (yazılacak; aynı bot tekrar işaretlenirse tek satır)
+        self.status = None  # bekleyen durum özeti
+        self.state = None  # snapshot için tam durum (SYSTEM_STATE)
+        self._wake = None
+
+    def load(self, state):
+        """Snapshot + günlüğü state'e uygular (bot ayarları koddan, çalışma alanları diskten)."""
+        bots = {b["id"]: b for b in state["bots"]}
+
+        def apply(saved):
+            bot = bots.get(saved.get("id"))
+            if bot is not None:
+                bot.update({k: saved[k] for k in BOT_FIELDS if k in saved})
+
+        loaded = False
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                state["status"] = data.get("status", state["status"])
+                for saved in data.get("bots", ()):
+                    apply(saved)
+                loaded = True
+            except Exception as e:
+                print(f"Error loading state: {e}")
+        self.state = state
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # çökme sırasında yarım kalmış son satır
+                    if "status" in entry: state["status"] = entry["status"]
+                    if "bot" in entry: apply(entry["bot"])
+            # Oynatılan günlük hemen snapshot'a katlanır (yarım satırın ardına yazılmasın)
+            self.compact()
+            loaded = True
+        return loaded
+
+    def mark(self, status, bots):
+        """Değişen botları ve durum özetini kuyruğa alır; yazımı arka plan görevi yapar."""
+        self.status = status
+        for bot in bots:
+            self.pending[bot["id"]] = bot
+        if self._wake is not None:
+            self._wake.set()
+
+    def _drain(self):
+        """Bekleyen kayıtları (olay döngüsünde, tutarlı anda) JSON satırlarına çevirir."""
+        lines = [json.dumps({"bot": {"id": bot_id, **{k: bot.get(k) for k in BOT_FIELDS}}}) for bot_id, bot in self.pending.items()]
+        if self.status is not None:
+            lines.append(json.dumps({"status": self.status}))
+        self.pending, self.status = {}, None
+        return lines
+
+    def _append(self, lines):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())  # toplu yazım başına tek fsync
+
+    def _snapshot(self):
+        # Olay döngüsünde serileştirilir; dosyaya yazım ayrı iş parçacığında olabilir
+        return json.dumps({
+            "status": self.state["status"],
+            "bots": [{k: v for k, v in bot.items() if not k.startswith("_")} for bot in self.state["bots"]],
+        }, indent=4)
+
+    def _write_snapshot(self, text):
+        atomic_write(self.snapshot_path, text)
+        # Snapshot'tan sonra kesilir; arada çökülürse günlük tekrar oynatılır (kayıtlar idempotent)
+        open(self.journal_path, "w").close()
+        self.lines = 0
+
+    def _write(self, lines, snapshot):
+        self._append(lines)
+        self.lines += len(lines)
+        if snapshot is not None:
+            self._write_snapshot(snapshot)
+
+    def compact(self):
+        """Tam durumu atomik snapshot olarak yazar ve günlüğü sıfırlar."""
+        self._write_snapshot(self._snapshot())
+
+    def flush(self):
+        """Bekleyenleri hemen yazar (kapanışta, senkron)."""
+        lines = self._drain()
+        if lines:
+            self._append(lines)
+            self.lines += len(lines)
+        if self.state is not None:
+            self.compact()
+
+    async def run(self):
+        """Arka plan yazıcısı: işaretlemeden sonra debounce süresi kadar bekler, birikenleri tek seferde yazar."""
+        self._wake = asyncio.Event()
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(self.debounce)
+            self._wake.clear()
+            lines = self._drain()
+            if not lines:
+                continue
+            snapshot = self._snapshot() if self.lines + len(lines) >= self.compact_every else None
+            write = asyncio.ensure_future(asyncio.to_thread(self._write, lines, snapshot))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # Kapanış: iş parçacığındaki yazım bitmeden flush() aynı dosyalara dokunmasın
+                await asyncio.wait([write])
+                raise
+            except Exception as e:
+                print(f"Error saving state: {e}")
+
+if __name__ == "__main__":
+    # Çökme benzetimi: günlüğe yazılıp snapshot alınmadan bırakılan durum ve yarım son satır geri yüklenir
+    import shutil
+    import tempfile
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "state.json")
+
+    def fresh():
+        return {"status": {"total_pnl": 0.0}, "bots": [{"id": i, "balance": 250.0, "pnl": 0.0, "active_trade": None, "active": False}
+                                                        for i in range(1000)]}
+
+    async def main():
+        journal = StateJournal(path, debounce=0.05, compact_every=10**9)
+        state = fresh()
+        journal.load(state)
+        writer = asyncio.create_task(journal.run())
+        await asyncio.sleep(0)
+        t0 = time.perf_counter()
+        for n in range(5000):
+            bot = state["bots"][n % 1000]
+            bot["balance"] += 1; state["status"]["total_pnl"] += 1
+            journal.mark(state["status"], [bot])
+        mark_us = (time.perf_counter() - t0) / 5000 * 1e6
+        await asyncio.sleep(0.3)
+        writer.cancel()
+        with open(journal.journal_path, "a") as f:
+            f.write('{"bot": {"id": 0, "bal')  # yarım satır
+        return state, mark_us
+
+    state, mark_us = asyncio.run(main())
+    restored = fresh()
+    t0 = time.perf_counter()
+    StateJournal(path).load(restored)
+    ok = restored["status"] == state["status"] and all(a["balance"] == b["balance"] for a, b in zip(restored["bots"], state["bots"]))
+    print(f"isaretleme {mark_us:.1f} us/degisiklik, geri yukleme {(time.perf_counter() - t0) * 1000:.1f} ms, parite: {'OK' if ok else 'FARK'}")
+    shutil.rmtree(tmp)
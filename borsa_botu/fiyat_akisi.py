@@ -0,0 +1,115 @@
+import asyncio
+import os
+import time
+
+# Canlı Fiyat Akışı (risk döngüsü için)
+# Her kaynak stream(symbol, active) ile (zaman_ms, fiyat) üreten bir async üreteçtir.
+# active() False dönerken (açık pozisyon yok) yoklama yapan kaynak borsaya istek atmaz:
+#   WebsocketFeed: ccxt.pro watch_trades, her işlem fiyatı (tikler arasındaki uç değerler kaçmaz)
+#   PollingFeed:   fetch_ticker ile hızlı yoklama (ccxt.pro yoksa)
+#   ReplayFeed:    yerel tekrar (CSV ya da liste), test ve çevrimdışı çalışma için
+
+class ReplayFeed:
+    """(zaman_ms, fiyat) dizisini sırayla oynatır; speed=0 beklemesiz, 1 gerçek zamanlı.
+    Zamanlar akışın başladığı ana (duvar saati) kaydırılır; pozisyon giriş zamanlarıyla karşılaştırılabilir."""
+    def __init__(self, ticks, speed=0.0):
+        self.ticks = ticks
+        self.speed = speed
+
+    @classmethod
+    def from_csv(cls, path, column='close', speed=0.0):
+        import pandas as pd
+        df = pd.read_csv(path)
+        ts = pd.to_datetime(df['timestamp']).astype('int64') // 10**6
+        return cls(list(zip(ts.tolist(), df[column].astype(float).tolist())), speed)
+
+    async def stream(self, symbol, active=None):
+        prev = None
+        shift = 0
+        for ts, price in self.ticks:
+            if prev is None:
+                shift = int(time.time() * 1000) - ts
+            await asyncio.sleep((ts - prev) / 1000 / self.speed if self.speed and prev is not None else 0)
+            prev = ts
+            yield ts + shift, price
+
+class PollingFeed:
+    def __init__(self, exchange, interval=0.5, timeout=5.0):
+        self.exchange = exchange
+        self.interval = interval
+        self.timeout = timeout
+
+    async def stream(self, symbol, active=None):
+        while True:
+            if active is not None and not active():
+                # Bekleyen tik birikmez: boştayken mum çekişleriyle aynı borsa istemcisini meşgul etme
+                await asyncio.sleep(self.interval)
+                continue
+            try:
+                ticker = await asyncio.wait_for(self.exchange.fetch_ticker(symbol), timeout=self.timeout)
+                if ticker.get('last'):
+                    yield ticker.get('timestamp') or int(time.time() * 1000), ticker['last']
+            except Exception as e:
+                print(f"[Fiyat Akisi] {symbol} ticker hatasi: {type(e).__name__} {e}")
+            await asyncio.sleep(self.interval)
+
+class WebsocketFeed:
+    def __init__(self, exchange_id='gate'):
+        import ccxt.pro as ccxtpro
+        self.exchange = getattr(ccxtpro, exchange_id)()
+
+    async def stream(self, symbol, active=None):
+        # active yok sayılır: akış boştayken de okunur, yoksa eski işlemler birikip girişten sonra işlenir
+        backoff = 1
+        while True:
+            try:
+                trades = await self.exchange.watch_trades(symbol)
+                backoff = 1
+            except Exception as e:
+                # Bağlantı koparsa artan beklemeyle yeniden bağlan
+                print(f"[Fiyat Akisi] {symbol} websocket hatasi: {type(e).__name__} {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            for trade in trades:
+                yield trade['timestamp'], trade['price']
+
+def make_feed(exchange):
+    """PRICE_FEED: 'ws' (varsayılan, ccxt.pro varsa), 'poll' ya da 'replay:<csv yolu>'."""
+    mode = os.getenv('PRICE_FEED', 'ws')
+    if mode.startswith('replay:'):
+        return ReplayFeed.from_csv(mode.split(':', 1)[1], speed=float(os.getenv('REPLAY_SPEED', 0)))
+    if mode == 'ws':
+        try:
+            return WebsocketFeed()
+        except (ImportError, AttributeError) as e:
+            print(f"[Fiyat Akisi] websocket kullanilamiyor ({e}), yoklamaya geciliyor.")
+    return PollingFeed(exchange, interval=float(os.getenv('PRICE_POLL_SEC', 0.5)))
+
+if __name__ == "__main__":
+    # Tekrar akışı üzerinden risk yolunun tik başına gecikmesi (sentetik 1 sn'lik tikler)
+    import numpy as np
+    from strateji import check_exit
+    rng = np.random.default_rng(5)
+    n = 200_000
+    prices = 30000 * np.exp(np.cumsum(rng.normal(0, 0.0003, n)))
+    feed = ReplayFeed(list(zip(range(0, n * 1000, 1000), prices.tolist())))
+    settings = {"sl": 0.02, "ts_trigger": 0.01, "ts_offset": 0.005}
+
+    async def main(n_trades=100):
+        trades = []
+        exits, latencies = 0, []
+        async for ts, price in feed.stream('BTC/USDT'):
+            t0 = time.perf_counter()
+            while len(trades) < n_trades:
+                trades.append({"side": "LONG" if len(trades) % 2 else "SHORT", "entry": price, "peak": price})
+            still_open = []
+            for active in trades:
+                if check_exit(active, settings, price): exits += 1
+                else: still_open.append(active)
+            trades = still_open
+            latencies.append(time.perf_counter() - t0)
+        lat = np.array(latencies) * 1e6
+        print(f"{n} tik, {n_trades} acik pozisyon: ortalama {lat.mean():.1f} us, p99 {np.percentile(lat, 99):.1f} us / tik, {exits} cikis")
+
+    asyncio.run(main())
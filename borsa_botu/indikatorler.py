@@ -0,0 +1,354 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Saf NumPy İndikatör Çekirdekleri (dizi girer, dizi çıkar)
+# Hesaplamalar pandas_ta (0.3.14b) tanımlarını izler; kolon isimleri de aynıdır.
+# Değişiklikte KERNEL_VERSION artırılır (analiz önbelleği anahtarına girer).
+KERNEL_VERSION = 1
+
+def _nan_like(x):
+    return np.full(len(x), np.nan)
+
+def _first_valid(x):
+    valid = np.flatnonzero(~np.isnan(x))
+    return valid[0] if valid.size else len(x)
+
+def _linear_recurrence(u, beta, y0=0.0):
+    """y[t] = beta * y[t-1] + u[t] özyinelemesini bloklar halinde vektörel çözer."""
+    u = np.asarray(u, dtype=np.float64)
+    y = np.empty_like(u)
+    if beta == 0:
+        y[:] = u
+        return y
+    # Blok boyu: beta^-m taşmasın (~1e150 sınırı)
+    m = int(min(2048, max(1, 345 / -np.log(beta))))
+    inv = beta ** -np.arange(m)
+    fwd = beta ** np.arange(m)
+    prev = y0
+    for s in range(0, len(u), m):
+        blk = u[s:s + m]
+        k = len(blk)
+        y[s:s + k] = fwd[:k] * (beta * prev + np.cumsum(blk * inv[:k]))
+        prev = y[s + k - 1]
+    return y
+
+def _ewm_adjusted(x, alpha, min_periods=0):
+    """pandas ewm(alpha, adjust=True).mean() karşılığı (baştaki NaN'lar atlanır)."""
+    out = _nan_like(x)
+    start = _first_valid(x)
+    if start >= len(x): return out
+    beta = 1.0 - alpha
+    num = _linear_recurrence(x[start:], beta)
+    den = _linear_recurrence(np.ones(len(x) - start), beta)
+    out[start:] = num / den
+    out[start:start + max(min_periods, 1) - 1] = np.nan
+    return out
+
+def _ewm_recursive(x, alpha, seed):
+    """seed'den başlayan adjust=False ewm: y = (1 - alpha) * y_prev + alpha * x."""
+    beta = 1.0 - alpha
+    return _linear_recurrence(alpha * x, beta, y0=seed)
+
+def _rolling(x, n, func):
+    out = _nan_like(x)
+    if len(x) >= n:
+        out[n - 1:] = func(sliding_window_view(x, n), axis=1)
+    return out
+
+def _rolling_sum(x, n):
+    """Kümülatif toplam farkıyla O(n) kayan toplam; penceresinde NaN olan bar NaN kalır."""
+    out = _nan_like(x)
+    if len(x) >= n:
+        nan = np.isnan(x)
+        # Büyük fiyat seviyelerinde hassasiyet için ilk geçerli değer etrafında topla
+        ref = x[_first_valid(x)] if not nan.all() else 0.0
+        csum = np.concatenate([[0.0], np.cumsum(np.where(nan, 0.0, x - ref))])
+        cnan = np.concatenate([[0], np.cumsum(nan)])
+        out[n - 1:] = np.where(cnan[n:] - cnan[:-n] > 0, np.nan, csum[n:] - csum[:-n] + n * ref)
+    return out
+
+def _non_zero_range(high, low):
+    diff = high - low
+    return np.where(diff == 0, np.finfo(float).eps, diff)
+
+def _shift(x, n=1):
+    out = _nan_like(x)
+    out[n:] = x[:-n]
+    return out
+
+# --- Hareketli Ortalamalar ---
+
+def sma(close, length=10):
+    return _rolling_sum(np.asarray(close, dtype=np.float64), length) / length
+
+def wma(close, length=10):
+    close = np.asarray(close, dtype=np.float64)
+    out = _nan_like(close)
+    if len(close) >= length:
+        w = np.arange(1, length + 1, dtype=np.float64)
+        out[length - 1:] = sliding_window_view(close, length) @ w / w.sum()
+    return out
+
+def rma(close, length=10):
+    """Wilder ortalaması: ewm(alpha=1/length, min_periods=length)."""
+    return _ewm_adjusted(np.asarray(close, dtype=np.float64), 1.0 / length, min_periods=length)
+
+def ema(close, length=10):
+    """İlk değer SMA ile tohumlanan EMA (span=length, adjust=False)."""
+    close = np.asarray(close, dtype=np.float64)
+    out = _nan_like(close)
+    start = _first_valid(close)
+    seed_at = start + length - 1
+    if seed_at >= len(close): return out
+    seed = close[start:seed_at + 1].mean()
+    out[seed_at] = seed
+    out[seed_at + 1:] = _ewm_recursive(close[seed_at + 1:], 2.0 / (length + 1), seed)
+    return out
+
+def hma(close, length=10):
+    close = np.asarray(close, dtype=np.float64)
+    half, root = int(length / 2), int(np.sqrt(length))
+    return wma(2 * wma(close, half) - wma(close, length), root)
+
+# --- Momentum ---
+
+def rsi(close, length=14):
+    close = np.asarray(close, dtype=np.float64)
+    diff = np.diff(close, prepend=np.nan)
+    pos_avg = rma(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    neg_avg = rma(np.where(diff < 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), length)
+    return 100 * pos_avg / (pos_avg + np.abs(neg_avg))
+
+def macd(close, fast=12, slow=26, signal=9):
+    """(macd, histogram, signal) döner."""
+    close = np.asarray(close, dtype=np.float64)
+    line = ema(close, fast) - ema(close, slow)
+    sig = ema(line, signal)
+    return line, line - sig, sig
+
+def stoch(high, low, close, k=14, d=3, smooth_k=3):
+    """(%K, %D) döner."""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    ll = _rolling(low, k, np.min)
+    hh = _rolling(high, k, np.max)
+    raw = 100 * (close - ll) / _non_zero_range(hh, ll)
+    stoch_k = _nan_like(close)
+    start = _first_valid(raw)
+    stoch_k[start:] = sma(raw[start:], smooth_k)
+    stoch_d = _nan_like(close)
+    start = _first_valid(stoch_k)
+    stoch_d[start:] = sma(stoch_k[start:], d)
+    return stoch_k, stoch_d
+
+def willr(high, low, close, length=14):
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    ll = _rolling(low, length, np.min)
+    hh = _rolling(high, length, np.max)
+    return 100 * ((close - ll) / (hh - ll) - 1)
+
+def er(close, length=10):
+    """Kaufman Verimlilik Oranı."""
+    close = np.asarray(close, dtype=np.float64)
+    change = np.abs(close - _shift(close, length))
+    volatility = _rolling_sum(np.abs(np.diff(close, prepend=np.nan)), length)
+    return change / volatility
+
+def ao(high, low, fast=5, slow=34):
+    median = 0.5 * (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64))
+    return sma(median, fast) - sma(median, slow)
+
+def mom(close, length=10):
+    close = np.asarray(close, dtype=np.float64)
+    return close - _shift(close, length)
+
+def cci(high, low, close, length=14, c=0.015):
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    tp = (high + low + close) / 3.0
+    mean_tp = sma(tp, length)
+    mad = _nan_like(tp)
+    if len(tp) >= length:
+        win = sliding_window_view(tp, length)
+        mad[length - 1:] = np.abs(win - win.mean(axis=1, keepdims=True)).mean(axis=1)
+    return (tp - mean_tp) / (c * mad)
+
+# --- Trend / Volatilite / Hacim ---
+
+def true_range(high, low, close):
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    prev_close = _shift(close)
+    tr = np.nanmax(np.abs(np.vstack([_non_zero_range(high, low), high - prev_close, prev_close - low])), axis=0)
+    tr[0] = np.nan
+    return tr
+
+def atr(high, low, close, length=14):
+    return rma(true_range(high, low, close), length)
+
+def adx(high, low, close, length=14):
+    """(ADX, DMP, DMN) döner."""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    k = 100 / atr(high, low, close, length)
+    up = high - _shift(high)
+    dn = _shift(low) - low
+    pos = np.where((up > dn) & (up > 0), up, 0.0)
+    neg = np.where((dn > up) & (dn > 0), dn, 0.0)
+    pos[0] = neg[0] = np.nan
+    dmp = k * rma(pos, length)
+    dmn = k * rma(neg, length)
+    dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    return rma(dx, length), dmp, dmn
+
+def supertrend(high, low, close, length=7, multiplier=3.0):
+    """(trend, yön, long, short) döner."""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    m = len(close)
+    hl2 = 0.5 * (high + low)
+    matr = multiplier * atr(high, low, close, length)
+    ub = (hl2 + matr).tolist()
+    lb = (hl2 - matr).tolist()
+    c = close.tolist()
+    direction = [1] * m
+    trend, long_, short_ = [np.nan] * m, [np.nan] * m, [np.nan] * m
+    for i in range(1, m):
+        if c[i] > ub[i - 1]:
+            direction[i] = 1
+        elif c[i] < lb[i - 1]:
+            direction[i] = -1
+        else:
+            direction[i] = direction[i - 1]
+            if direction[i] > 0 and lb[i] < lb[i - 1]: lb[i] = lb[i - 1]
+            if direction[i] < 0 and ub[i] > ub[i - 1]: ub[i] = ub[i - 1]
+        if direction[i] > 0: trend[i] = long_[i] = lb[i]
+        else: trend[i] = short_[i] = ub[i]
+    return np.array(trend), np.array(direction, dtype=np.float64), np.array(long_), np.array(short_)
+
+def mfi(high, low, close, volume, length=14):
+    high, low, close, volume = (np.asarray(a, dtype=np.float64) for a in (high, low, close, volume))
+    tp = (high + low + close) / 3.0
+    raw = tp * volume
+    diff = np.diff(tp, prepend=np.nan)
+    psum = _rolling_sum(np.where(diff > 0, raw, 0.0), length)
+    nsum = _rolling_sum(np.where(diff < 0, raw, 0.0), length)
+    return 100 * psum / (psum + nsum)
+
+# --- DataFrame Köprüsü (pandas_ta kolon isimleriyle) ---
+
+def compute(name, o, h, l, c, v):
+    """İndikatörü hesaplar; {kolon_adi: dizi} döner."""
+    if name == 'rsi': return {'RSI_14': rsi(c)}
+    if name == 'macd':
+        line, hist, sig = macd(c)
+        return {'MACD_12_26_9': line, 'MACDh_12_26_9': hist, 'MACDs_12_26_9': sig}
+    if name == 'adx':
+        a, p, n = adx(h, l, c)
+        return {'ADX_14': a, 'DMP_14': p, 'DMN_14': n}
+    if name == 'stoch':
+        k, d = stoch(h, l, c)
+        return {'STOCHk_14_3_3': k, 'STOCHd_14_3_3': d}
+    if name == 'willr': return {'WILLR_14': willr(h, l, c)}
+    if name == 'supertrend':
+        t, d, lo, sh = supertrend(h, l, c)
+        return {'SUPERT_7_3.0': t, 'SUPERTd_7_3.0': d, 'SUPERTl_7_3.0': lo, 'SUPERTs_7_3.0': sh}
+    if name == 'ema20': return {'EMA_20': ema(c, 20)}
+    if name == 'ema50': return {'EMA_50': ema(c, 50)}
+    if name == 'hma': return {'HMA_20': hma(c, 20)}
+    if name == 'er': return {'ER_10': er(c)}
+    if name == 'ao': return {'AO_5_34': ao(h, l)}
+    if name == 'mom': return {'MOM_10': mom(c)}
+    if name == 'cci': return {'CCI_14_0.015': cci(h, l, c)}
+    if name == 'mfi': return {'MFI_14': mfi(h, l, c, v)}
+    raise KeyError(name)
+
+INDICATORS = ['rsi', 'macd', 'adx', 'stoch', 'willr', 'supertrend', 'ema20', 'ema50', 'hma', 'er', 'ao', 'mom', 'cci', 'mfi']
+
+def add_indicators(df, names=INDICATORS):
+    """df.ta.*(append=True) yerine: kolonları tek seferde ekler."""
+    o, h, l, c, v = (df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume'))
+    for name in names:
+        for col, values in compute(name, o, h, l, c, v).items():
+            df[col] = values
+    return df
+
+# --- pandas_ta Uyum Kontrolü ve Hız Ölçümü ---
+# pandas_ta ile aynı tanımlar; ilk barlardaki ısınma farkları (ewm başlangıcı) hariç tolerans ile karşılaştırılır.
+# Not: pandas_ta 0.4.x geliştirme sürümlerindeki cci, "tp - mean / (c * mad)" öncelik hatası yüzünden FARK verir.
+PARITY_CALLS = {
+    'rsi': ('rsi', {}), 'macd': ('macd', {}), 'adx': ('adx', {}), 'stoch': ('stoch', {}),
+    'willr': ('willr', {}), 'supertrend': ('supertrend', {}), 'ema20': ('ema', {'length': 20}),
+    'ema50': ('ema', {'length': 50}), 'hma': ('hma', {'length': 20}), 'er': ('er', {}),
+    'ao': ('ao', {}), 'mom': ('mom', {}), 'cci': ('cci', {}), 'mfi': ('mfi', {})
+}
+
+def kernel_for(ta_name, params):
+    """pandas_ta çağrısına karşılık gelen çekirdek adını döner (yoksa None)."""
+    for name, call in PARITY_CALLS.items():
+        if call == (ta_name, params):
+            return name
+    return None
+
+def parity_check(df, warmup=300, rtol=1e-6, atol=1e-6):
+    """Her indikatörü pandas_ta ile karşılaştırır; {isim: (uyumlu_mu, maks_fark)} döner."""
+    import pandas_ta as ta
+    o, h, l, c, v = (df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume'))
+    report = {}
+    for name, (ta_name, params) in PARITY_CALLS.items():
+        ref = getattr(df.ta, ta_name)(**params)
+        ours = compute(name, o, h, l, c, v)
+        worst, ok = 0.0, True
+        for col, values in ours.items():
+            expected = (ref[col] if hasattr(ref, 'columns') else ref).to_numpy(dtype=np.float64)[warmup:]
+            got = values[warmup:]
+            both = ~np.isnan(expected) & ~np.isnan(got)
+            ok &= bool(np.array_equal(np.isnan(expected), np.isnan(got)))
+            if both.any():
+                diff = np.abs(expected[both] - got[both])
+                worst = max(worst, float(diff.max()))
+                ok &= bool(np.all(diff <= atol + rtol * np.abs(expected[both])))
+        report[name] = (ok, worst)
+    return report
+
+def benchmark(df, repeat=3):
+    """pandas_ta erişimcileri ile çekirdeklerin süresini (sn) karşılaştırır."""
+    import time
+    import pandas_ta as ta
+    o, h, l, c, v = (df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume'))
+    result = {}
+    for name, (ta_name, params) in PARITY_CALLS.items():
+        t0 = time.perf_counter()
+        for _ in range(repeat): getattr(df.ta, ta_name)(**params)
+        t1 = time.perf_counter()
+        for _ in range(repeat): compute(name, o, h, l, c, v)
+        t2 = time.perf_counter()
+        result[name] = ((t1 - t0) / repeat, (t2 - t1) / repeat)
+    return result
+
+if __name__ == "__main__":
+    import sys
+    import pandas as pd
+    if len(sys.argv) > 1:
+        data = pd.read_csv(sys.argv[1])
+    else:
+        # Sentetik rastgele yürüyüş (105k bar ~ 1 yıllık 5m veri)
+        rng = np.random.default_rng(7)
+        n = 105_000
+        close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+        open_ = np.r_[close[0], close[:-1]]
+        data = pd.DataFrame({
+            'open': open_, 'close': close,
+            'high': np.maximum(open_, close) * (1 + rng.random(n) * 0.002),
+            'low': np.minimum(open_, close) * (1 - rng.random(n) * 0.002),
+            'volume': rng.random(n) * 100
+        })
+    print(f"--- İndikatör Çekirdekleri: {len(data)} bar ---")
+    parity = parity_check(data)
+    timing = benchmark(data)
+    for name in PARITY_CALLS:
+        ok, worst = parity[name]
+        ta_sec, np_sec = timing[name]
+        print(f"{name:<11} {'OK ' if ok else 'FARK'} maks_fark={worst:.2e} | pandas_ta {ta_sec*1000:8.2f} ms | numpy {np_sec*1000:8.2f} ms | x{ta_sec / max(np_sec, 1e-9):.1f}")
+    # Canlı motor her döngüde 100 mumluk çerçeve hesaplar: toplam süre karşılaştırması
+    live = benchmark(data.tail(100).reset_index(drop=True), repeat=20)
+    ta_total = sum(t for t, _ in live.values())
+    np_total = sum(t for _, t in live.values())
+    print(f"100 mum (tam set): pandas_ta {ta_total*1000:.2f} ms | numpy {np_total*1000:.2f} ms | x{ta_total / max(np_total, 1e-9):.1f}")
+    if not all(ok for ok, _ in parity.values()):
+        sys.exit(1)
@@ -0,0 +1,473 @@
+import asyncio
+import math
+from collections import deque
+from functools import partial
+import numpy as np
+import pandas as pd
+
+# Artımlı Mum Tamponu (canlı Quadrant motoru için)
+# Her zaman dilimi için kayan OHLCV penceresi + bar bar güncellenen indikatör durumu.
+# Borsadan yalnızca son saklanan mumdan itibaren veri çekilir; geçmiş yeniden hesaplanmaz.
+# Formüller indikatorler.py çekirdekleriyle aynıdır (kolon isimleri dahil).
+
+NAN = float('nan')
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+WARMUP_CANDLES = 300
+OFFLOAD_CANDLES = 10  # bundan uzun çekişler executor'da işlenir (normal turda 1-2 mum gelir)
+
+def _div(a, b):
+    """numpy gibi: sıfıra bölmede hata yerine inf/NaN."""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or math.isnan(a): return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+def _nzr(high, low):
+    diff = high - low
+    return diff if diff != 0 else np.finfo(float).eps
+
+def _true_range(high, low, prev_close):
+    if math.isnan(prev_close): return NAN
+    return max(abs(_nzr(high, low)), abs(high - prev_close), abs(prev_close - low))
+
+def _mean(win):
+    return sum(win) / len(win) if win is not None else NAN
+
+# --- Akış Temel Taşları ---
+# update(x, closed): closed=False iken (oluşan mum) sonuç hesaplanır ama durum değişmez.
+
+class _Ewm:
+    """ewm(alpha, adjust=True, min_periods) akışı (rma); baştaki NaN'lar atlanır."""
+    def __init__(self, alpha, min_periods=0):
+        self.decay = 1.0 - alpha
+        self.min_periods = max(min_periods, 1)
+        self.num = self.den = 0.0
+        self.count = 0
+
+    def update(self, x, closed):
+        if self.count == 0 and math.isnan(x): return NAN
+        num = self.decay * self.num + x
+        den = self.decay * self.den + 1.0
+        count = self.count + 1
+        if closed: self.num, self.den, self.count = num, den, count
+        return num / den if count >= self.min_periods else NAN
+
+class _Ema:
+    """SMA tohumlu EMA (adjust=False) akışı."""
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.seed = []
+        self.value = None
+
+    def update(self, x, closed):
+        if self.value is None:
+            if not self.seed and math.isnan(x): return NAN
+            seed = self.seed + [x]
+            if closed: self.seed = seed
+            if len(seed) < self.length: return NAN
+            value = sum(seed) / self.length
+        else:
+            value = (1.0 - self.alpha) * self.value + self.alpha * x
+        if closed: self.value = value
+        return value
+
+class _Window:
+    """Son n değer; pencere dolmadan None döner."""
+    def __init__(self, n):
+        self.n = n
+        self.values = deque(maxlen=n)
+
+    def update(self, x, closed):
+        if closed:
+            self.values.append(x)
+            win = self.values
+        else:
+            win = list(self.values)[len(self.values) - self.n + 1:] if len(self.values) >= self.n else list(self.values)
+            win.append(x)
+        return win if len(win) == self.n else None
+
+class _Lag:
+    """n bar önceki değer."""
+    def __init__(self, n=1):
+        self.window = _Window(n + 1)
+
+    def update(self, x, closed):
+        win = self.window.update(x, closed)
+        return win[0] if win is not None else NAN
+
+# --- İndikatör Akışları (indikatorler.compute ile aynı kolonlar) ---
+
+class _Rsi:
+    columns = ('RSI_14',)
+    def __init__(self, length=14):
+        self.prev = _Lag()
+        self.pos, self.neg = _Ewm(1.0 / length, length), _Ewm(1.0 / length, length)
+
+    def update(self, o, h, l, c, v, closed):
+        diff = c - self.prev.update(c, closed)
+        zero = NAN if math.isnan(diff) else 0.0
+        pos = self.pos.update(diff if diff > 0 else zero, closed)
+        neg = self.neg.update(diff if diff < 0 else zero, closed)
+        return (_div(100 * pos, pos + abs(neg)),)
+
+class _Macd:
+    columns = ('MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9')
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast, self.slow, self.signal = _Ema(fast), _Ema(slow), _Ema(signal)
+
+    def update(self, o, h, l, c, v, closed):
+        line = self.fast.update(c, closed) - self.slow.update(c, closed)
+        sig = self.signal.update(line, closed)
+        return line, line - sig, sig
+
+class _Adx:
+    columns = ('ADX_14', 'DMP_14', 'DMN_14')
+    def __init__(self, length=14):
+        self.prev_h, self.prev_l, self.prev_c = _Lag(), _Lag(), _Lag()
+        self.atr, self.pos, self.neg, self.dx = (_Ewm(1.0 / length, length) for _ in range(4))
+
+    def update(self, o, h, l, c, v, closed):
+        ph, pl, pc = self.prev_h.update(h, closed), self.prev_l.update(l, closed), self.prev_c.update(c, closed)
+        k = _div(100, self.atr.update(_true_range(h, l, pc), closed))
+        if math.isnan(ph):
+            pos = neg = NAN
+        else:
+            up, dn = h - ph, pl - l
+            pos = up if up > dn and up > 0 else 0.0
+            neg = dn if dn > up and dn > 0 else 0.0
+        dmp = k * self.pos.update(pos, closed)
+        dmn = k * self.neg.update(neg, closed)
+        dx = _div(100 * abs(dmp - dmn), dmp + dmn)
+        return self.dx.update(dx, closed), dmp, dmn
+
+class _Stoch:
+    columns = ('STOCHk_14_3_3', 'STOCHd_14_3_3')
+    def __init__(self, k=14, d=3, smooth_k=3):
+        self.lows, self.highs = _Window(k), _Window(k)
+        self.k, self.d = _Window(smooth_k), _Window(d)
+
+    def update(self, o, h, l, c, v, closed):
+        lows, highs = self.lows.update(l, closed), self.highs.update(h, closed)
+        raw = NAN
+        if lows is not None:
+            ll, hh = min(lows), max(highs)
+            raw = _div(100 * (c - ll), _nzr(hh, ll))
+        stoch_k = _mean(self.k.update(raw, closed))
+        return stoch_k, _mean(self.d.update(stoch_k, closed))
+
+class _Willr:
+    columns = ('WILLR_14',)
+    def __init__(self, length=14):
+        self.lows, self.highs = _Window(length), _Window(length)
+
+    def update(self, o, h, l, c, v, closed):
+        lows, highs = self.lows.update(l, closed), self.highs.update(h, closed)
+        if lows is None: return (NAN,)
+        ll, hh = min(lows), max(highs)
+        return (100 * (_div(c - ll, hh - ll) - 1),)
+
+class _Supertrend:
+    columns = ('SUPERT_7_3.0', 'SUPERTd_7_3.0', 'SUPERTl_7_3.0', 'SUPERTs_7_3.0')
+    def __init__(self, length=7, multiplier=3.0):
+        self.prev_c = _Lag()
+        self.atr = _Ewm(1.0 / length, length)
+        self.multiplier = multiplier
+        self.state = None  # son kapanmış bar: (yön, üst bant, alt bant)
+
+    def update(self, o, h, l, c, v, closed):
+        matr = self.multiplier * self.atr.update(_true_range(h, l, self.prev_c.update(c, closed)), closed)
+        hl2 = 0.5 * (h + l)
+        ub, lb = hl2 + matr, hl2 - matr
+        direction = 1
+        if self.state is not None:
+            prev_dir, prev_ub, prev_lb = self.state
+            if c > prev_ub:
+                direction = 1
+            elif c < prev_lb:
+                direction = -1
+            else:
+                direction = prev_dir
+                if direction > 0 and lb < prev_lb: lb = prev_lb
+                if direction < 0 and ub > prev_ub: ub = prev_ub
+        first = self.state is None
+        if closed: self.state = (direction, ub, lb)
+        if first: return NAN, float(direction), NAN, NAN
+        if direction > 0: return lb, 1.0, lb, NAN
+        return ub, -1.0, NAN, ub
+
+class _EmaColumn:
+    def __init__(self, length):
+        self.columns = (f'EMA_{length}',)
+        self.ema = _Ema(length)
+
+    def update(self, o, h, l, c, v, closed):
+        return (self.ema.update(c, closed),)
+
+class _Hma:
+    columns = ('HMA_20',)
+    def __init__(self, length=20):
+        half, root = int(length / 2), int(np.sqrt(length))
+        self.half, self.full, self.root = _Window(half), _Window(length), _Window(root)
+
+    @staticmethod
+    def _wma(win):
+        if win is None: return NAN
+        return sum(w * x for w, x in enumerate(win, 1)) / (len(win) * (len(win) + 1) / 2)
+
+    def update(self, o, h, l, c, v, closed):
+        raw = 2 * self._wma(self.half.update(c, closed)) - self._wma(self.full.update(c, closed))
+        return (self._wma(self.root.update(raw, closed)),)
+
+class _Er:
+    columns = ('ER_10',)
+    def __init__(self, length=10):
+        self.lag, self.prev = _Lag(length), _Lag()
+        self.moves = _Window(length)
+
+    def update(self, o, h, l, c, v, closed):
+        change = abs(c - self.lag.update(c, closed))
+        moves = self.moves.update(abs(c - self.prev.update(c, closed)), closed)
+        return (_div(change, sum(moves)) if moves is not None else NAN,)
+
+class _Ao:
+    columns = ('AO_5_34',)
+    def __init__(self, fast=5, slow=34):
+        self.fast, self.slow = _Window(fast), _Window(slow)
+
+    def update(self, o, h, l, c, v, closed):
+        median = 0.5 * (h + l)
+        return (_mean(self.fast.update(median, closed)) - _mean(self.slow.update(median, closed)),)
+
+class _Mom:
+    columns = ('MOM_10',)
+    def __init__(self, length=10):
+        self.lag = _Lag(length)
+
+    def update(self, o, h, l, c, v, closed):
+        return (c - self.lag.update(c, closed),)
+
+class _Cci:
+    columns = ('CCI_14_0.015',)
+    def __init__(self, length=14, c=0.015):
+        self.window = _Window(length)
+        self.c = c
+
+    def update(self, o, h, l, c, v, closed):
+        tp = (h + l + c) / 3.0
+        win = self.window.update(tp, closed)
+        if win is None: return (NAN,)
+        mean = sum(win) / len(win)
+        mad = sum(abs(x - mean) for x in win) / len(win)
+        return (_div(tp - mean, self.c * mad),)
+
+class _Mfi:
+    columns = ('MFI_14',)
+    def __init__(self, length=14):
+        self.prev = _Lag()
+        self.pos, self.neg = _Window(length), _Window(length)
+
+    def update(self, o, h, l, c, v, closed):
+        tp = (h + l + c) / 3.0
+        raw = tp * v
+        diff = tp - self.prev.update(tp, closed)
+        pos = self.pos.update(raw if diff > 0 else 0.0, closed)
+        neg = self.neg.update(raw if diff < 0 else 0.0, closed)
+        if pos is None: return (NAN,)
+        psum, nsum = sum(pos), sum(neg)
+        return (_div(100 * psum, psum + nsum),)
+
+STREAMS = {
+    'rsi': _Rsi, 'macd': _Macd, 'adx': _Adx, 'stoch': _Stoch, 'willr': _Willr, 'supertrend': _Supertrend,
+    'ema20': partial(_EmaColumn, 20), 'ema50': partial(_EmaColumn, 50), 'hma': _Hma, 'er': _Er,
+    'ao': _Ao, 'mom': _Mom, 'cci': _Cci, 'mfi': _Mfi
+}
+
+LIVE_INDICATORS = ['rsi', 'macd', 'adx', 'stoch', 'willr', 'supertrend', 'ema20', 'ema50', 'er', 'ao', 'mom', 'cci', 'mfi']
+
+# Kolon -> onu üreten akış (strateji kurallarının istediği kolonlardan akış setini çözmek için)
+COLUMN_STREAMS = {col: name for name, factory in STREAMS.items() for col in factory().columns}
+# Canlı motorun üretebildiği tüm kolonlar (PSAR, FISHER, VORTEX, CHOP, TSI, UO gibi akışı olmayanlar hariç)
+LIVE_COLUMNS = OHLCV_COLUMNS + list(COLUMN_STREAMS)
+
+def resolve_streams(columns):
+    """Kuralların kullandığı kolonlar için gereken akışlar (STREAMS sırasıyla); akışı olmayan kolonda KeyError."""
+    from strateji import resolve_column
+    needed = set()
+    for col in columns:
+        name = resolve_column(col, LIVE_COLUMNS)
+        if name not in OHLCV_COLUMNS:
+            needed.add(COLUMN_STREAMS[name])
+    return [stream for stream in STREAMS if stream in needed]
+
+def timeframe_seconds(timeframe):
+    """'5m', '4h', '1d' gibi zaman dilimini saniyeye çevirir."""
+    units = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+class CandleBuffer:
+    """Tek zaman dilimi için kayan mum + artımlı indikatör tamponu.
+
+    Son satır oluşmakta olan mumdur: her çekişte yeniden değerlendirilir ama indikatör
+    durumuna ancak daha yeni bir mum geldiğinde (kapandığında) kalıcı olarak işlenir.
+    """
+    def __init__(self, timeframe, indicators=LIVE_INDICATORS, capacity=100, warmup=WARMUP_CANDLES):
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self.warmup = max(warmup, 2 * capacity)
+        self.indicators = list(indicators)
+        self.streams = [STREAMS[name]() for name in self.indicators]
+        self.columns = OHLCV_COLUMNS + [col for stream in self.streams for col in stream.columns]
+        self._rows = np.full((2 * capacity, len(self.columns)), np.nan)
+        self._n = 0
+        self._forming = None  # oluşan mumun ham OHLCV satırı
+        self._closed = deque(maxlen=self.warmup)  # yeni akış eklenince yeniden oynatmak için
+        self.layout = 0  # kolon düzeni her değiştiğinde artar (derlenmiş planlar için)
+
+    def ensure(self, indicators):
+        """Akış setini günceller: eklenenler saklı kapanmış mumlarla ısıtılır, gerekmeyenler bırakılır."""
+        indicators = list(indicators)
+        if indicators == self.indicators: return
+        current = dict(zip(self.indicators, self.streams))
+        old_index = {col: i for i, col in enumerate(self.columns)}
+        n_closed = self._n - 1 if self._forming is not None else self._n
+        skip = len(self._closed) - n_closed
+        streams, replayed = [], {}
+        for name in indicators:
+            stream = current.get(name)
+            if stream is None:
+                stream = STREAMS[name]()
+                outputs = [stream.update(*candle[1:], True) for candle in self._closed]
+                # Tampondaki kapanmış satırlara denk gelen geçmiş değerler
+                history = np.array(outputs[skip:], dtype=np.float64).reshape(n_closed, len(stream.columns))
+                replayed.update(zip(stream.columns, history.T))
+            streams.append(stream)
+        columns = OHLCV_COLUMNS + [col for stream in streams for col in stream.columns]
+        rows = np.full((len(self._rows), len(columns)), np.nan)
+        for j, col in enumerate(columns):
+            if col in replayed: rows[:n_closed, j] = replayed[col]
+            else: rows[:self._n, j] = self._rows[:self._n, old_index[col]]
+        self.indicators, self.streams, self.columns, self._rows = indicators, streams, columns, rows
+        self.layout += 1
+        if self._forming is not None:
+            self._rows[self._n - 1] = self._evaluate(self._forming, closed=False)
+
+    @property
+    def since(self):
+        """Bir sonraki çekişin başlangıcı (oluşan mumun zamanı, ms)."""
+        return int(self._forming[0]) if self._forming is not None else None
+
+    def _evaluate(self, candle, closed):
+        row = list(candle)
+        for stream in self.streams:
+            row.extend(stream.update(*candle[1:], closed))
+        return row
+
+    def _append(self):
+        if self._n == len(self._rows):
+            keep = self.capacity - 1
+            self._rows[:keep] = self._rows[self._n - keep:self._n]
+            self._n = keep
+        self._n += 1
+
+    def ingest(self, ohlcv):
+        """fetch_ohlcv çıktısını işler; kapanan mum sayısını döner."""
+        closed_count = 0
+        changed = False
+        for candle in ohlcv:
+            candle = [float(x) if x is not None else NAN for x in candle[:6]]
+            if self._forming is not None:
+                if candle[0] < self._forming[0]: continue
+                if candle[0] > self._forming[0]:
+                    # Önceki mum kapandı: son haliyle kalıcı olarak işle
+                    self._rows[self._n - 1] = self._evaluate(self._forming, closed=True)
+                    self._closed.append(self._forming)
+                    closed_count += 1
+                    self._append()
+            else:
+                self._append()
+            self._forming = candle
+            changed = True
+        if changed:
+            self._rows[self._n - 1] = self._evaluate(self._forming, closed=False)
+        return closed_count
+
+    async def refresh(self, exchange, symbol, executor=None):
+        """İlk çağrıda ısınma geçmişini, sonrakilerde yalnızca oluşan mumdan itibarenki mumları çeker.
+        executor verilirse uzun girdiler (ısınma, kopukluk sonrası) olay döngüsü dışında işlenir."""
+        if self._forming is None:
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe=self.timeframe, limit=self.warmup)
+        else:
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe=self.timeframe, since=self.since)
+        if executor is not None and len(ohlcv) > OFFLOAD_CANDLES:
+            return await asyncio.get_running_loop().run_in_executor(executor, self.ingest, ohlcv)
+        return self.ingest(ohlcv)
+
+    @property
+    def values(self):
+        """Tampondaki satırlar (kopyasız görünüm); son satır oluşan mumdur."""
+        return self._rows[:self._n]
+
+    def closed_values(self, until):
+        """`until` (ms) anına kadar kapanmış mumların satırları; o anda açılmış mum hariç tutulur."""
+        rows = self.values
+        if self._forming is not None and self._forming[0] >= until:
+            return rows[:-1]
+        return rows
+
+    def frame(self):
+        """Son `capacity` mumu indikatör kolonlarıyla DataFrame olarak döner."""
+        start = max(0, self._n - self.capacity)
+        return pd.DataFrame(self._rows[start:self._n].copy(), columns=self.columns)
+
+if __name__ == "__main__":
+    # Uyum kontrolü: mumlar parça parça (oluşan mum güncellemeleriyle) beslenir, yolun ortasında
+    # akış seti genişletilir; sonuç tam geçmiş üzerinde indikatorler.add_indicators ile karşılaştırılır.
+    import sys
+    import time
+    import indikatorler
+    rng = np.random.default_rng(11)
+    n = 3000
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.003, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.002)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.002)
+    volume = rng.random(n) * 100
+    ts = np.arange(n) * 300_000.0
+    candles = np.column_stack([ts, open_, high, low, close, volume]).tolist()
+
+    buf = CandleBuffer('5m', indicators=['willr'])
+    buf.ingest(candles[:WARMUP_CANDLES])
+    cycle_times = []
+    for i in range(WARMUP_CANDLES, n):
+        t, o, h, l, c, v = candles[i]
+        # Oluşan mumun iki ara hali, ardından kesin hali (bir önceki mumla birlikte gelir)
+        for frac in (0.3, 0.7):
+            partial_candle = [t, o, max(o, o + (h - o) * frac), min(o, o + (l - o) * frac), o + (c - o) * frac, v * frac]
+            t0 = time.perf_counter()
+            buf.ingest([candles[i - 1], partial_candle])
+            cycle_times.append(time.perf_counter() - t0)
+        buf.ingest([candles[i]])
+        if i == n // 2:
+            buf.ensure(indikatorler.INDICATORS)
+            cycle_times = []
+
+    ref = indikatorler.add_indicators(pd.DataFrame(candles, columns=OHLCV_COLUMNS))
+    got = buf.frame()
+    expected = ref.iloc[-buf.capacity:][got.columns].to_numpy()
+    values = got.to_numpy()
+    same_nan = np.array_equal(np.isnan(expected), np.isnan(values))
+    both = ~np.isnan(expected) & ~np.isnan(values)
+    worst = float(np.max(np.abs(expected[both] - values[both]) / np.maximum(1.0, np.abs(expected[both]))))
+    ok = same_nan and worst < 1e-8
+    print(f"Artımlı tampon uyumu: {'OK' if ok else 'FARK'} (maks_goreli_fark={worst:.2e})")
+
+    window = pd.DataFrame(candles[-100:], columns=OHLCV_COLUMNS)
+    t0 = time.perf_counter()
+    for _ in range(50): indikatorler.add_indicators(window.copy(), LIVE_INDICATORS)
+    full = (time.perf_counter() - t0) / 50
+    step = sum(cycle_times) / len(cycle_times)
+    print(f"Döngü başına: 100 mum tam hesap {full*1000:.2f} ms | artımlı {step*1000:.3f} ms | x{full / step:.1f}")
+    if not ok:
+        sys.exit(1)
@@ -1,8 +1,9 @@
 import pandas as pd
 import pandas_ta as ta
 import numpy as np
-import os
 from datetime import datetime
+from analiz_motoru import UltimateMegaAnalyzerV9
+import strateji
 
 # Nihai Şampiyonun İşlem Geçmişini Raporlayan Motor
 class ChampionTradeLogger:
@@ -15,19 +16,13 @@ class ChampionTradeLogger:
         
     def prepare_data(self):
         csv_path = f"btc_usdt_{self.tf}.csv"
-        if not os.path.exists(csv_path): return None, None
-        df = pd.read_csv(csv_path)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.set_index('timestamp', inplace=True)
+        # İndikatörler analiz motorunun önbelleğinden gelir (CSV değişmediyse yeniden hesaplanmaz)
+        features = UltimateMegaAnalyzerV9().load_features(csv_path)
+        if features is None: return None, None
+        df = features[0]
         
-        # Sadece şampiyonun indikatörleri
-        df.ta.willr(append=True)
-        df.ta.er(length=10, append=True)
-        df.fillna(method='ffill', inplace=True)
-        
-        # Sinyaller
-        l_cond = (df['WILLR_14'] < -80) & (df['ER_10'] > 0.5)
-        s_cond = (df['WILLR_14'] > -20) & (df['ER_10'] > 0.5)
+        # Sinyaller: sweep ve canlı motorla aynı kurallar (strateji.RULES)
+        l_cond, s_cond = strateji.combo_masks(self.combo, df)
         
         sig_df = pd.DataFrame(index=df.index)
         sig_df['L'] = l_cond.astype(int)
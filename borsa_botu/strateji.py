@@ -0,0 +1,201 @@
+import operator
+import re
+from functools import lru_cache
+import numpy as np
+
+# Strateji Kuralları: canlı motor ve backtest için tek tanım
+# Kural metni: "WILLR_14 < -80 & ER_10 > 0.5" (terimler & ile bağlanır, hepsi sağlanmalı).
+# Taraf: kolon adı, geri bar için kolon[n] (ör. close[1] = bir önceki kapanış) ya da sayı.
+# Kolon adı tam eşleşmezse önek olarak aranır (pandas_ta sürümleri arasında değişen son ekler için).
+# Backtest'te vektörel maskeye, canlıda kolon indeksli O(1) son-bar kontrolüne derlenir.
+
+# İndikatör adı -> (LONG kuralı, SHORT kuralı); sweep kombinasyonları ve bot tanımları bu adları kullanır
+RULES = {
+    'RSI': ('RSI_14 < 30', 'RSI_14 > 70'),
+    'MACD': ('MACDh_12_26_9 > 0', 'MACDh_12_26_9 < 0'),
+    # Trend gücü + yön için fiyata bakılır (V10 kuralı)
+    'ADX': ('ADX_14 > 25 & close > close[1]', 'ADX_14 > 25 & close < close[1]'),
+    'STOCH': ('STOCHk_14_3_3 < 20', 'STOCHk_14_3_3 > 80'),
+    'WILLR': ('WILLR_14 < -80', 'WILLR_14 > -20'),
+    'SUPERT': ('SUPERTd_7_3.0 == 1', 'SUPERTd_7_3.0 == -1'),
+    'EMA': ('EMA_20 > EMA_50', 'EMA_20 < EMA_50'),
+    'PSAR': ('close > PSARl_0.02_0.2', 'close < PSARs_0.02_0.2'),
+    'FISHER': ('FISHERT_9_1 > 0', 'FISHERT_9_1 < 0'),
+    'VORTEX': ('VTXP_14 > VTXM_14', 'VTXP_14 < VTXM_14'),
+    'HMA': ('close > HMA_20', 'close < HMA_20'),
+    'ER': ('ER_10 > 0.5', 'ER_10 > 0.5'),
+    'AO': ('AO_5_34 > 0', 'AO_5_34 < 0'),
+    'CHOP': ('CHOP_14 < 38', 'CHOP_14 < 38'),
+    'MFI': ('MFI_14 < 20', 'MFI_14 > 80'),
+    'CCI': ('CCI_14_0.015 < -100', 'CCI_14_0.015 > 100'),
+    'MOM': ('MOM_10 > 0', 'MOM_10 < 0'),
+    'TSI': ('TSI_13 > 0', 'TSI_13 < 0'),
+    'UO': ('UO_7_14_28 < 30', 'UO_7_14_28 > 70'),
+}
+
+OPERATORS = {'<': operator.lt, '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+             '==': operator.eq, '!=': operator.ne}
+
+_TERM = re.compile(r'^\s*(\S+?)\s*(<=|>=|==|!=|<|>)\s*(\S+)\s*$')
+_COLUMN = re.compile(r'^([A-Za-z_][A-Za-z0-9_.]*)(?:\[(\d+)\])?$')
+
+def _side(token, text):
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    match = _COLUMN.match(token)
+    if not match:
+        raise ValueError(f"Gecersiz kural terimi '{token}': {text}")
+    return match.group(1), int(match.group(2) or 0)
+
+@lru_cache(maxsize=None)
+def parse_rule(text):
+    """Kural metnini ((kolon, geri_bar) | sayı, op, (kolon, geri_bar) | sayı) terimlerine ayırır."""
+    terms = []
+    for part in text.split('&'):
+        match = _TERM.match(part)
+        if not match:
+            raise ValueError(f"Gecersiz kural: {text}")
+        lhs, op, rhs = match.groups()
+        terms.append((_side(lhs, text), op, _side(rhs, text)))
+    return tuple(terms)
+
+def resolve_column(name, columns):
+    """Tam eşleşme, yoksa büyük/küçük harf duyarsız ilk önek eşleşmesi; bulunamazsa KeyError."""
+    if name in columns: return name
+    lowered = name.lower()
+    for col in columns:
+        if col.lower().startswith(lowered): return col
+    raise KeyError(name)
+
+def rule_columns(text):
+    return {side[0] for term in parse_rule(text) for side in (term[0], term[2]) if isinstance(side, tuple)}
+
+def bot_rules(bot):
+    """Botun kural grupları [(long, short), ...]: açık "rules" alanı ya da indikatör adlarından."""
+    if bot.get("rules"):
+        return [(bot["rules"]["long"], bot["rules"]["short"])]
+    unknown = [ind for ind in bot.get("indicators", ()) if ind.upper() not in RULES]
+    if unknown:
+        raise ValueError(f"Tanimsiz indikator: {', '.join(unknown)}")
+    return [RULES[ind.upper()] for ind in bot.get("indicators", ())]
+
+# --- Backtest: vektörel maske ---
+
+def _series(side, columns):
+    if not isinstance(side, tuple):
+        return side
+    name, back = side
+    values = columns[name]
+    if back == 0:
+        return values
+    shifted = np.full(len(values), np.nan)
+    shifted[back:] = values[:-back]
+    return shifted
+
+def vector_mask(text, df):
+    """Kuralı tüm barlar için bool diziye çevirir (NaN içeren karşılaştırma False)."""
+    names = df.columns.tolist()
+    columns = {name: df[resolve_column(name, names)].to_numpy(dtype=np.float64) for name in rule_columns(text)}
+    mask = np.ones(len(df), dtype=bool)
+    for lhs, op, rhs in parse_rule(text):
+        mask &= OPERATORS[op](_series(lhs, columns), _series(rhs, columns))
+    return mask
+
+def combo_masks(indicators, df):
+    """Sweep kombinasyonunun (ör. ['WILLR', 'ER']) LONG/SHORT maskeleri."""
+    long_mask = np.ones(len(df), dtype=bool)
+    short_mask = np.ones(len(df), dtype=bool)
+    for ind in indicators:
+        long_rule, short_rule = RULES[ind.upper()]
+        long_mask &= vector_mask(long_rule, df)
+        short_mask &= vector_mask(short_rule, df)
+    return long_mask, short_mask
+
+# --- Canlı: derlenmiş son-bar planı ---
+
+def _operand(side, columns):
+    """Kolon tarafını (indeks, geri_bar), sabiti (None, değer) yapar; kolon yoksa KeyError."""
+    if not isinstance(side, tuple):
+        return None, side
+    return columns.index(resolve_column(side[0], columns)), side[1]
+
+class StrategyPlan:
+    """Derlenmiş long/short terim listeleri: (sol_idx, sol_geri, op, sağ_idx, sağ_geri/sabit)."""
+    __slots__ = ('long', 'short')
+
+    def __init__(self, long_terms, short_terms):
+        self.long = long_terms
+        self.short = short_terms
+
+    @staticmethod
+    def _holds(terms, rows):
+        for a_idx, a_arg, op, b_idx, b_arg in terms:
+            a = a_arg if a_idx is None else rows[-1 - a_arg, a_idx]
+            b = b_arg if b_idx is None else rows[-1 - b_arg, b_idx]
+            if not op(a, b):
+                return False
+        return True
+
+    def signal(self, rows):
+        """Tampon satırlarından (son satır = şimdiki bar) LONG/SHORT/WAIT döner."""
+        if self.long and self._holds(self.long, rows): return "LONG"
+        if self.short and self._holds(self.short, rows): return "SHORT"
+        return "WAIT"
+
+def compile_plan(rule_groups, columns):
+    """Kural gruplarını plana derler; tamponda kolonu olmayan terim varsa ValueError (koşul sessizce zayıflamaz)."""
+    columns = list(columns)
+    long_terms, short_terms = [], []
+    for group in rule_groups:
+        try:
+            compiled = [[(*_operand(lhs, columns), OPERATORS[op], *_operand(rhs, columns)) for lhs, op, rhs in parse_rule(text)]
+                        for text in group]
+        except KeyError as e:
+            raise ValueError(f"Kural derlenemedi, '{e.args[0]}' kolonu yok: {group}")
+        long_terms.extend(compiled[0])
+        short_terms.extend(compiled[1])
+    return StrategyPlan(long_terms, short_terms)
+
+def required_columns(bot):
+    return {col for group in bot_rules(bot) for text in group for col in rule_columns(text)}
+
+def rule_error(bot, columns):
+    """Botun kuralları verilen kolonlarla (ör. canlı akışların ürettikleri) derlenemiyorsa sebebi, yoksa None."""
+    try:
+        if not bot_rules(bot):
+            return "Tanimli kural yok"
+        for col in required_columns(bot):
+            resolve_column(col, columns)
+    except KeyError as e:
+        return f"Canli akisi olmayan kolon: {e.args[0]}"
+    except ValueError as e:
+        return str(e)
+    return None
+
+def plan_for(bot, buffer, cache):
+    """Kural setinin planını önbellekten verir (aynı kuralları paylaşan botlar, ör. varyantlar, tek planı kullanır);
+    tampon düzeni değiştiyse yeniden derler."""
+    groups = tuple(bot_rules(bot))
+    key = (groups, id(buffer))
+    cached = cache.get(key)
+    if cached is None or cached[0] != buffer.layout:
+        cached = cache[key] = (buffer.layout, compile_plan(groups, buffer.columns))
+    return cached[1]
+
+# --- Risk: fiyat tikinde çıkış kontrolü ---
+
+def check_exit(active, settings, price):
+    """Pozisyon zirvesini günceller; trailing stop ya da stop loss tetiklenirse sebebini döner."""
+    entry, side = active["entry"], active["side"]
+    pnl_raw = (price - entry) / entry if side == "LONG" else (entry - price) / entry
+    peak = active["peak"] = max(active["peak"], price) if side == "LONG" else min(active["peak"], price)
+    # Trailing Stop V10 Kuralları (%1 kar sonrası %0.5 takip)
+    if pnl_raw >= settings["ts_trigger"]:
+        retrace = (peak - price) / peak if side == "LONG" else (price - peak) / peak
+        if retrace >= settings["ts_offset"]:
+            return "Trailing Stop"
+    if pnl_raw <= -settings["sl"]:
+        return "Stop Loss"
+    return None